@@ -2,25 +2,31 @@ import logging
 from flask import Flask
 
 from src.routes import api
-from src.scheduler import start_scheduler
 from src.logs import log_to_file
 
-app = Flask(__name__, template_folder='templates')
-app.register_blueprint(api)
-
-log = logging.getLogger('werkzeug')
-
 
 class HealthCheckFilter(logging.Filter):
     def filter(self, record):
-        return '/health' not in record.getMessage()
+        message = record.getMessage()
+        return '/health' not in message and '/ready' not in message
+
+
+health_check_filter = HealthCheckFilter()
+
 
+def create_app(warm_up=True):
+    """Build the Flask app. The scheduler and stores start in a background warm-up, see /ready."""
+    app = Flask(__name__, template_folder='templates')
+    app.register_blueprint(api)
 
-log.addFilter(HealthCheckFilter())
+    logging.getLogger('werkzeug').addFilter(health_check_filter)
 
-start_scheduler()
+    if warm_up:
+        from src.boot import start_warmup
+        start_warmup()
+    return app
 
 
 if __name__ == '__main__':
     log_to_file("================================ Flask Service Status: Started ================================")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    create_app().run(host='0.0.0.0', port=5000, debug=False)
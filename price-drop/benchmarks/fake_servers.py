@@ -0,0 +1,175 @@
+"""Local stand-ins for the Yahoo chart/quote API and the Telegram Bot API.
+
+Run as a separate process so their CPU and memory do not count against the
+check cycle being measured. Prints "READY <yahoo_port> <telegram_port>" once
+both are listening. Each server answers GET /__stats and POST /__reset.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record(self, bytes_in, bytes_out, error):
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors,
+                    "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+
+def make_meta(symbol, rng):
+    now = int(time.time())
+    previous_close = 100.0
+    price = round(previous_close * (1 + rng.uniform(-0.03, 0.01)), 4)
+    return {
+        "symbol": symbol,
+        "currency": "USD",
+        "regularMarketPrice": price,
+        "previousClose": previous_close,
+        "chartPreviousClose": previous_close,
+        "regularMarketDayHigh": max(price, previous_close) * 1.005,
+        "regularMarketTime": now,
+        "exchangeTimezoneName": "Europe/London",
+        "currentTradingPeriod": {"regular": {"start": now - 3600, "end": now + 3600}},
+    }
+
+
+def chart_body(symbol, points, rng):
+    meta = make_meta(symbol, rng)
+    start = meta["regularMarketTime"] - 60 * points
+    closes = [round(meta["regularMarketPrice"] * (1 + rng.uniform(-0.002, 0.002)), 4) for _ in range(points)]
+    return {"chart": {"result": [{
+        "meta": meta,
+        "timestamp": [start + 60 * i for i in range(points)],
+        "indicators": {"quote": [{
+            "open": closes, "high": closes, "low": closes, "close": closes,
+            "volume": [rng.randint(0, 10000) for _ in range(points)],
+        }]},
+    }], "error": None}}
+
+
+def quote_body(symbols, rng):
+    result = []
+    for symbol in symbols:
+        meta = make_meta(symbol, rng)
+        result.append({
+            "symbol": symbol,
+            "regularMarketPrice": meta["regularMarketPrice"],
+            "regularMarketPreviousClose": meta["previousClose"],
+            "regularMarketDayHigh": meta["regularMarketDayHigh"],
+            "regularMarketTime": meta["regularMarketTime"],
+            "exchangeTimezoneName": meta["exchangeTimezoneName"],
+        })
+    return {"quoteResponse": {"result": result, "error": None}}
+
+
+def make_handler(name, options, stats, rng):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return len(data)
+
+        def handle_request(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            if url.path == "/__stats":
+                return self.send_json(200, stats.snapshot())
+            if url.path == "/__reset":
+                stats.reset()
+                return self.send_json(200, {"ok": True})
+
+            if options.latency_ms:
+                time.sleep(options.latency_ms / 1000 * rng.uniform(0.5, 1.5))
+            if rng.random() < options.error_rate:
+                sent = self.send_json(503, {"error": "injected"})
+                stats.record(length, sent, True)
+                return
+
+            query = parse_qs(url.query)
+            if name == "telegram" and url.path.endswith("/sendMessage"):
+                body = {"ok": True, "result": {"message_id": stats.requests}}
+            elif url.path.startswith("/v8/finance/chart/"):
+                points = options.points if query.get("interval") == ["1m"] else 1
+                body = chart_body(url.path.rsplit("/", 1)[-1], points, rng)
+            elif url.path == "/v7/finance/quote":
+                body = quote_body(query.get("symbols", [""])[0].split(","), rng)
+            else:
+                sent = self.send_json(404, {"error": "not found"})
+                stats.record(length, sent, True)
+                return
+            stats.record(length, self.send_json(200, body), False)
+
+        do_GET = handle_request
+        do_POST = handle_request
+
+    return Handler
+
+
+def start_server(name, options, port=0):
+    stats = Stats()
+    rng = random.Random(options.seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(name, options, stats, rng))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=float, default=20, help="mean injected latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--points", type=int, default=390, help="candles in a 1-minute chart response")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    yahoo = start_server("yahoo", options)
+    telegram = start_server("telegram", options)
+    print(f"READY {yahoo.server_address[1]} {telegram.server_address[1]}", flush=True)
+    try:
+        sys.stdin.read()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
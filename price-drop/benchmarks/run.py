@@ -0,0 +1,233 @@
+"""Benchmark full check cycles against local Yahoo and Telegram stand-ins.
+
+    python benchmarks/run.py --sizes 8,100,1000 --output bench.json
+    python benchmarks/run.py --compare bench.json
+
+Every cycle is a forced manual check of all symbols (no quote cache, no
+adaptive skipping), followed by delivery of the queued Telegram alerts.
+The fake servers run in a child process, so CPU time and peak memory are
+those of the check cycle alone.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_sha():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "src"], cwd=ROOT, capture_output=True, text=True).stdout
+        return sha + ("-dirty" if dirty.strip() else "")
+    except OSError:
+        return None
+
+
+def start_fake_servers(args):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "fake_servers.py"),
+         "--latency-ms", str(args.latency_ms), "--error-rate", str(args.error_rate),
+         "--points", str(args.points), "--seed", str(args.seed)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    ready = process.stdout.readline().split()
+    if not ready or ready[0] != "READY":
+        process.kill()
+        raise RuntimeError("Fake servers failed to start")
+    return process, f"http://127.0.0.1:{ready[1]}", f"http://127.0.0.1:{ready[2]}"
+
+
+def server_call(base_url, path, method="GET"):
+    request = urllib.request.Request(base_url + path, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def configure(args, workdir, yahoo_url, telegram_url):
+    """Point the app at the fake servers and a scratch data dir; must run before src is imported."""
+    os.environ.update({
+        "YAHOO_BASE_URL": yahoo_url,
+        "TELEGRAM_API_URL": telegram_url,
+        "TELEGRAM_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "bench",
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "METRICS_DIR": os.path.join(workdir, "metrics"),
+        "QUOTE_PROVIDER": args.provider,
+        "QUOTE_PROFILE": args.profile,
+        "TELEGRAM_CHAT_RATE": "1000000",
+        "TELEGRAM_GLOBAL_RATE": "1000000",
+        "TELEGRAM_BURST": "1000000",
+    })
+    sys.path.insert(0, ROOT)
+
+
+class Cycle:
+    """One benchmark configuration: the app's modules rebound to a generated symbol universe."""
+
+    def __init__(self, size):
+        from src import price_checker, rules, notifier
+
+        self.symbols = [f"BENCH{i:04d}.L" for i in range(size)]
+        price_checker.SYMBOLS = rules.SYMBOLS = self.symbols
+        price_checker.SYMBOL_NAMES = {symbol: f"Bench {symbol}" for symbol in self.symbols}
+        price_checker.open_symbols = lambda symbols, now: list(symbols)
+        rules.compiled_rules = None
+        notifier.ensure_sender = lambda: None
+
+    def reset(self):
+        from src import alerts, change_tracker, circuit_breaker, rules
+        from src.config import ALERT_THRESHOLDS_FILE
+
+        change_tracker.states.clear()
+        circuit_breaker.breakers.clear()
+        rules.price_windows.clear()
+        alerts.states.clear()
+        if os.path.exists(ALERT_THRESHOLDS_FILE):
+            os.remove(ALERT_THRESHOLDS_FILE)
+
+    def run(self):
+        from src.price_checker import check_prices
+        from src.notifier import process_next
+
+        check_prices(manual=True, force=True)
+        sent = 0
+        while process_next():
+            sent += 1
+        return sent
+
+
+def measure(size, args, yahoo_url, telegram_url):
+    from src.logs import flush_logs
+
+    cycle = Cycle(size)
+    walls, cpus, requests, bytes_out, errors, messages = [], [], [], [], [], []
+    for i in range(args.warmup + args.repeat):
+        cycle.reset()
+        flush_logs()
+        for url in (yahoo_url, telegram_url):
+            server_call(url, "/__reset", "POST")
+        wall, cpu = time.perf_counter(), time.process_time()
+        sent = cycle.run()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        flush_logs()
+        if i < args.warmup:
+            continue
+        stats = [server_call(url, "/__stats") for url in (yahoo_url, telegram_url)]
+        walls.append(wall)
+        cpus.append(cpu)
+        requests.append(sum(s["requests"] for s in stats))
+        bytes_out.append(sum(s["bytes_in"] + s["bytes_out"] for s in stats))
+        errors.append(sum(s["errors"] for s in stats))
+        messages.append(sent)
+
+    cycle.reset()
+    tracemalloc.start()
+    cycle.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    flush_logs()
+
+    return {
+        "symbols": size,
+        "wall_s": round(statistics.median(walls), 4),
+        "wall_min_s": round(min(walls), 4),
+        "cpu_s": round(statistics.median(cpus), 4),
+        "requests": round(statistics.median(requests)),
+        "bytes": round(statistics.median(bytes_out)),
+        "upstream_errors": round(statistics.median(errors)),
+        "telegram_messages": round(statistics.median(messages)),
+        "peak_mem_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print per-size changes against a previous run; return True if any wall or CPU time regressed past threshold."""
+    previous = {entry["symbols"]: entry for entry in baseline["results"]}
+    regressed = False
+    print(f"Against {baseline.get('git_sha')}:", file=sys.stderr)
+    if baseline.get("settings") != report["settings"]:
+        print("  warning: benchmark settings differ, numbers are not comparable", file=sys.stderr)
+    for entry in report["results"]:
+        old = previous.get(entry["symbols"])
+        if old is None:
+            continue
+        changes = []
+        for key in ("wall_s", "cpu_s", "requests", "bytes", "peak_mem_kib"):
+            if old[key]:
+                change = (entry[key] - old[key]) / old[key]
+                changes.append(f"{key} {change:+.1%}")
+                if key in ("wall_s", "cpu_s") and change > threshold:
+                    regressed = True
+        print(f"  {entry['symbols']:>5} symbols: {', '.join(changes)}", file=sys.stderr)
+    return regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="8,100,1000", help="comma-separated symbol counts")
+    parser.add_argument("--repeat", type=int, default=3, help="measured cycles per size (median is reported)")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--provider", choices=("chart", "batch"), default="chart")
+    parser.add_argument("--profile", choices=("meta", "full"), default="meta")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--points", type=int, default=390, help="candles per full-profile chart response")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed wall/CPU regression for --compare")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server, yahoo_url, telegram_url = start_fake_servers(args)
+    workdir = tempfile.mkdtemp(prefix="price-drop-bench-")
+    try:
+        configure(args, workdir, yahoo_url, telegram_url)
+        results = []
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for size in (int(s) for s in args.sizes.split(",")):
+                results.append(measure(size, args, yahoo_url, telegram_url))
+                print(f"{size:>5} symbols: {results[-1]['wall_s']:.3f}s wall, "
+                      f"{results[-1]['requests']} requests", file=sys.stderr)
+    finally:
+        server.stdin.close()
+        server.wait(timeout=5)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "git_sha": git_sha(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "settings": {key: getattr(args, key) for key in
+                     ("provider", "profile", "latency_ms", "error_rate", "points", "seed")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(report, json.load(f), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import math
+
+from src.config import ALERT_THRESHOLD_FIRST, ALERT_THRESHOLD_STEP
+from src.rules import update_zscores
+
+EPSILON = 1e-9
+
+
+def ladder_threshold(change_pct, first=ALERT_THRESHOLD_FIRST, step=ALERT_THRESHOLD_STEP):
+    """Deepest step of the ladder first, first + step, ... reached by change_pct.
+
+    Closed form of walking the ladder one step at a time; EPSILON keeps a
+    change sitting exactly on a step from rounding to the step above.
+    """
+    steps = max(math.floor((change_pct - first) / step + EPSILON), -1)
+    return round(first + steps * step, 10)
+
+
+def add_zscores(quotes, windows):
+    """Advance each symbol's rolling prices once per cycle and attach a z-score per window.
+
+    windows maps symbols to every volatility window any rule set uses on
+    them; symbols without one are returned unchanged.
+    """
+    return [
+        dict(quote, zscores=update_zscores(quote["symbol"], quote["price"], windows[quote["symbol"]]))
+        if windows.get(quote["symbol"]) else quote
+        for quote in quotes
+    ]
+
+
+def evaluate_alerts(quotes, rules, last_sent):
+    """Return the alerts to emit for the whole cycle.
+
+    quotes are the cycle's checked results, rules the compiled
+    {symbol: SymbolRules} and last_sent the levels already alerted today,
+    keyed by rule state key. Each alert is a dict with symbol, rule, key,
+    value and level. Quotes that already carry zscores (see add_zscores)
+    do not advance the rolling prices again.
+    """
+    alerts = []
+    for quote in quotes:
+        symbol_rules = rules.get(quote["symbol"])
+        if symbol_rules is None:
+            continue
+        if symbol_rules.windows and "zscores" not in quote:
+            quote = dict(quote, zscores=update_zscores(quote["symbol"], quote["price"], symbol_rules.windows))
+
+        for rule in symbol_rules.rules:
+            value = rule.measure(quote)
+            if not rule.reached(value):
+                continue
+            level = ladder_threshold(value, rule.first, rule.step)
+            key = rule.state_key(quote["symbol"])
+            if rule.is_new(level, last_sent.get(key, 0.0)):
+                alerts.append({
+                    "symbol": quote["symbol"],
+                    "rule": rule.name,
+                    "key": key,
+                    "value": value,
+                    "level": level
+                })
+    return alerts
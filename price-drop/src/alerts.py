@@ -1,57 +1,162 @@
 import os
 import json
+import fcntl
+import tempfile
+import threading
 from datetime import datetime
 
 from src.config import ALERT_THRESHOLDS_FILE
+from src.metrics import Counter, Histogram
+
+write_duration = Histogram("price_drop_alert_state_write_duration_seconds", "Time to persist the alert threshold file")
+writes_total = Counter("price_drop_alert_state_writes_total", "Alert threshold file writes")
+
+
+class AlertState:
+    """Today's sent alert thresholds, kept in memory and persisted atomically.
+
+    The file is re-read only when its mtime changes (another process wrote
+    it). Updates stay in memory until flush(), which writes a temp file,
+    fsyncs it and renames it over the old one, so a crash never leaves a
+    half-written file behind. flush() holds a lock on a sidecar file and
+    merges in whatever another process wrote since our load, so concurrent
+    cycles never drop each other's thresholds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.date = None
+        self.file_date = None
+        self.mtime = None
+        self.thresholds = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def read_file(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None, {}
+        return data.get('date'), data.get('thresholds', {})
+
+    def load(self, today):
+        mtime = self.file_mtime()
+        if self.date == today and (self.dirty or mtime == self.mtime):
+            return
+
+        thresholds = {}
+        self.file_date = None
+        if mtime is not None:
+            self.file_date, stored = self.read_file()
+            if self.file_date == today:
+                thresholds = stored
+
+        self.date = today
+        self.mtime = mtime
+        self.thresholds = thresholds
+        self.dirty = False
+
+    def get(self):
+        with self.lock:
+            self.load(datetime.now().strftime('%Y-%m-%d'))
+            return dict(self.thresholds)
+
+    def set(self, key, threshold):
+        with self.lock:
+            self.load(datetime.now().strftime('%Y-%m-%d'))
+            self.thresholds[key] = threshold
+            self.dirty = True
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            with write_duration.time(), open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                file_date, stored = self.read_file()
+                if file_date == self.date:
+                    self.thresholds = merge_thresholds(stored, self.thresholds)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".alert_thresholds.")
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        json.dump({'date': self.date, 'thresholds': self.thresholds}, f)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+                self.mtime = self.file_mtime()
+            writes_total.inc()
+            self.file_date = self.date
+            self.dirty = False
+
+    def discard(self):
+        """Drop updates not flushed yet; the next read reloads the file."""
+        with self.lock:
+            self.date = None
+            self.dirty = False
+
+    def cleanup(self):
+        with self.lock:
+            self.load(datetime.now().strftime('%Y-%m-%d'))
+            if self.mtime is not None and self.file_date is not None and self.file_date != self.date:
+                os.remove(self.path)
+                self.mtime = None
+                self.file_date = None
+
+
+def merge_thresholds(stored, current):
+    """Union of two threshold maps, keeping the deeper level for keys in both."""
+    merged = dict(stored)
+    for key, level in current.items():
+        if abs(level) >= abs(merged.get(key, 0.0)):
+            merged[key] = level
+    return merged
+
+
+states = {}
+states_lock = threading.Lock()
+
+
+def get_alert_state():
+    with states_lock:
+        state = states.get(ALERT_THRESHOLDS_FILE)
+        if state is None:
+            state = states[ALERT_THRESHOLDS_FILE] = AlertState(ALERT_THRESHOLDS_FILE)
+        return state
 
 
 def get_alert_thresholds():
-    if not os.path.exists(ALERT_THRESHOLDS_FILE):
-        return {}
-    
-    try:
-        with open(ALERT_THRESHOLDS_FILE, "r") as f:
-            data = json.load(f)
-        
-        today = datetime.now().strftime('%Y-%m-%d')
-        if data.get('date') == today:
-            return data.get('thresholds', {})
-        else:
-            return {}
-    except:
-        return {}
+    return get_alert_state().get()
+
+
+def record_alert_threshold(key, threshold):
+    get_alert_state().set(key, threshold)
+
+
+def flush_alert_thresholds():
+    get_alert_state().flush()
+
+
+def discard_alert_thresholds():
+    get_alert_state().discard()
 
 
 def save_alert_threshold(symbol, threshold):
-    os.makedirs(os.path.dirname(ALERT_THRESHOLDS_FILE), exist_ok=True)
-    
-    today = datetime.now().strftime('%Y-%m-%d')
-    data = {'date': today, 'thresholds': {}}
-    
-    if os.path.exists(ALERT_THRESHOLDS_FILE):
-        try:
-            with open(ALERT_THRESHOLDS_FILE, "r") as f:
-                existing = json.load(f)
-            if existing.get('date') == today:
-                data['thresholds'] = existing.get('thresholds', {})
-        except:
-            pass
-    
-    data['thresholds'][symbol] = threshold
-    
-    with open(ALERT_THRESHOLDS_FILE, "w") as f:
-        json.dump(data, f)
+    state = get_alert_state()
+    state.set(symbol, threshold)
+    state.flush()
 
 
 def cleanup_alert_file():
-    today = datetime.now().strftime('%Y-%m-%d')
-    
-    if os.path.exists(ALERT_THRESHOLDS_FILE):
-        try:
-            with open(ALERT_THRESHOLDS_FILE, "r") as f:
-                data = json.load(f)
-            
-            if data.get('date') != today:
-                os.remove(ALERT_THRESHOLDS_FILE)
-        except:
-            pass
\ No newline at end of file
+    get_alert_state().cleanup()
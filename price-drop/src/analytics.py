@@ -0,0 +1,64 @@
+from src.config import ANALYTICS_DRAWDOWN_MINUTES, ANALYTICS_VELOCITY_MINUTES
+
+
+def clean_candles(candles):
+    """Rows of (timestamp, high, low, close, volume), skipping minutes Yahoo left empty."""
+    rows = zip(candles["timestamp"], candles["high"], candles["low"], candles["close"], candles["volume"])
+    return [
+        (ts, high, low, close, volume or 0)
+        for ts, high, low, close, volume in rows
+        if close is not None and high is not None and low is not None
+    ]
+
+
+def pct(value, base):
+    return round((value - base) / base * 100, 4) if base else None
+
+
+def intraday_analytics(candles, price):
+    """Intraday signals from the 1-minute series, in one pass over the candles.
+
+    drop_from_high: price vs the highest 1-minute high so far today.
+    vwap_deviation: price vs the volume-weighted average price.
+    drawdown: deepest peak-to-trough fall of the closes in the last
+    ANALYTICS_DRAWDOWN_MINUTES. velocity: change of the close per minute
+    over the last ANALYTICS_VELOCITY_MINUTES. All values are percentages.
+    Returns None when there are no usable candles.
+    """
+    rows = clean_candles(candles)
+    if not rows:
+        return None
+
+    last_ts = rows[-1][0]
+    drawdown_from = last_ts - ANALYTICS_DRAWDOWN_MINUTES * 60
+    velocity_from = last_ts - ANALYTICS_VELOCITY_MINUTES * 60
+
+    day_high = None
+    volume_total = 0
+    weighted_total = 0.0
+    peak = None
+    drawdown = 0.0
+    velocity_base = None
+
+    for ts, high, low, close, volume in rows:
+        if day_high is None or high > day_high:
+            day_high = high
+        volume_total += volume
+        weighted_total += (high + low + close) / 3 * volume
+        if ts >= drawdown_from:
+            if peak is None or close > peak:
+                peak = close
+            drawdown = min(drawdown, (close - peak) / peak * 100)
+        if velocity_base is None and ts >= velocity_from:
+            velocity_base = (ts, close)
+
+    velocity = None
+    if velocity_base is not None and last_ts > velocity_base[0]:
+        velocity = round(pct(rows[-1][3], velocity_base[1]) / ((last_ts - velocity_base[0]) / 60), 4)
+
+    return {
+        "drop_from_high": pct(price, day_high),
+        "vwap_deviation": pct(price, weighted_total / volume_total) if volume_total else None,
+        "drawdown": round(drawdown, 4),
+        "velocity": velocity,
+    }
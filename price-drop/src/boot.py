@@ -0,0 +1,43 @@
+import threading
+import time
+
+from src.logs import log_to_file
+from src import status_store
+
+ready = threading.Event()
+state = {"warmup_seconds": None, "error": None}
+warmup_thread = None
+warmup_lock = threading.Lock()
+
+
+def warm_up():
+    """Open the shared stores and start the scheduler and job runner, off the request path."""
+    started = time.monotonic()
+    try:
+        status_store.load()
+        from src.scheduler import start_scheduler
+        from src.check_jobs import ensure_runner
+        start_scheduler()
+        ensure_runner()
+        ready.set()
+    except Exception as e:
+        state["error"] = str(e)
+        log_to_file(f"Warm-up failed: {e}", level="ERROR")
+    state["warmup_seconds"] = round(time.monotonic() - started, 3)
+
+
+def start_warmup():
+    """Run warm_up() once per process in a background thread."""
+    global warmup_thread
+    with warmup_lock:
+        if warmup_thread is None:
+            warmup_thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+            warmup_thread.start()
+
+
+def readiness():
+    return {
+        "ready": ready.is_set(),
+        "warmup_seconds": state["warmup_seconds"],
+        "error": state["error"],
+    }
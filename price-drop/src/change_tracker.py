@@ -0,0 +1,84 @@
+import threading
+
+from src.config import CLOSED_POLL_INTERVAL
+
+
+class SymbolState:
+    def __init__(self):
+        self.quote_key = None
+        self.session_start = None
+        self.session_end = None
+        self.last_polled = None
+        self.next_poll = None
+        self.result = None
+
+
+states = {}
+states_lock = threading.Lock()
+
+
+def get_state(symbol):
+    with states_lock:
+        state = states.get(symbol)
+        if state is None:
+            state = states[symbol] = SymbolState()
+        return state
+
+
+def should_poll(symbol, now_ts):
+    """Skip symbols whose last known regular session has not opened yet or has already closed.
+
+    Closed symbols are still polled every CLOSED_POLL_INTERVAL seconds to
+    pick up the next session's trading period. In session, a symbol is
+    polled once its planned next poll time has passed.
+    """
+    state = get_state(symbol)
+    due = state.next_poll is None or state.last_polled is None or now_ts >= state.next_poll
+    if state.session_start is None or state.session_end is None:
+        return due
+    if now_ts < state.session_start:
+        return False
+    if now_ts < state.session_end:
+        return due
+    return now_ts - state.last_polled >= CLOSED_POLL_INTERVAL
+
+
+def observe(symbol, meta, now_ts):
+    """Record the quote's market time and session; return True if the quote changed since the last poll."""
+    state = get_state(symbol)
+    state.last_polled = now_ts
+    period = (meta.get('currentTradingPeriod') or {}).get('regular') or {}
+    state.session_start = period.get('start')
+    state.session_end = period.get('end')
+
+    quote_key = (meta.get('regularMarketTime'), meta.get('regularMarketPrice'), meta.get('previousClose'))
+    changed = state.result is None or state.result.get("status") != "checked" or quote_key != state.quote_key
+    state.quote_key = quote_key
+    return changed
+
+
+def forget(symbols):
+    """Treat the symbols' last quotes as unseen and due, so a failed cycle's quotes are evaluated again."""
+    for symbol in symbols:
+        state = get_state(symbol)
+        state.quote_key = None
+        state.next_poll = None
+
+
+def mark_polled(symbol, now_ts):
+    get_state(symbol).last_polled = now_ts
+
+
+def schedule(symbol, interval):
+    """Plan the symbol's next poll interval seconds after its last poll."""
+    state = get_state(symbol)
+    if state.last_polled is not None:
+        state.next_poll = state.last_polled + interval
+
+
+def set_result(symbol, result):
+    get_state(symbol).result = result
+
+
+def get_result(symbol):
+    return get_state(symbol).result
@@ -0,0 +1,151 @@
+import threading
+import time
+import uuid
+
+from src.config import JOBS_DB, CHECK_JOB_TIMEOUT, CHECK_JOB_RETENTION, CHECK_JOB_POLL_SECONDS
+from src.db import get_connection
+from src.logs import log_to_file
+from src.leader import is_leader
+from src.price_checker import check_prices
+from src import status_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS check_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    force INTEGER NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    status_version INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS check_jobs_created ON check_jobs (created);
+"""
+
+FIELDS = ("id", "status", "force", "created", "started", "finished", "status_version", "error")
+
+wake = threading.Event()
+runner_thread = None
+runner_lock = threading.Lock()
+
+
+def submit(force=False):
+    """Queue a manual check and return (job_id, merged).
+
+    If a job is already queued or running in any worker (and a forced
+    refresh is not asked of a non-forced one), its id is returned instead.
+    Whichever worker takes the request, the job is run by the leader.
+    """
+    conn = get_connection(JOBS_DB, SCHEMA)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM check_jobs WHERE created < ?", (now - CHECK_JOB_RETENTION,))
+        row = conn.execute(
+            "SELECT id FROM check_jobs WHERE status IN ('queued', 'running') AND created >= ? AND force >= ? "
+            "ORDER BY created DESC LIMIT 1",
+            (now - CHECK_JOB_TIMEOUT, int(force))
+        ).fetchone()
+        if row is not None:
+            conn.execute("COMMIT")
+            return row[0], True
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO check_jobs (id, status, force, created) VALUES (?, 'queued', ?, ?)",
+            (job_id, int(force), now)
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    wake.set()
+    return job_id, False
+
+
+def claim_next():
+    """Mark the oldest unexpired queued job running and return (job_id, force), or None."""
+    conn = get_connection(JOBS_DB, SCHEMA)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, force FROM check_jobs WHERE status = 'queued' AND created >= ? ORDER BY created LIMIT 1",
+            (now - CHECK_JOB_TIMEOUT,)
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE check_jobs SET status = 'running', started = ? WHERE id = ?", (now, row[0]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def run_job(job_id, force):
+    """Run a claimed job; it is marked failed if the cycle reported an error."""
+    conn = get_connection(JOBS_DB, SCHEMA)
+    try:
+        error = check_prices(manual=True, force=force)
+    except Exception as e:
+        error = str(e)
+    if error is None:
+        conn.execute(
+            "UPDATE check_jobs SET status = 'done', finished = ?, status_version = ? WHERE id = ?",
+            (time.time(), status_store.load()[0], job_id)
+        )
+    else:
+        log_to_file(f"Check job {job_id} failed: {error}", level="ERROR")
+        conn.execute(
+            "UPDATE check_jobs SET status = 'failed', finished = ?, error = ? WHERE id = ?",
+            (time.time(), error, job_id)
+        )
+
+
+def run_next():
+    """Run the next queued job if this process is the leader; return True if one ran.
+
+    Only the leader runs checks, so a manual job shares its quote cache and
+    alert state and is serialized with its scheduled cycles.
+    """
+    if not is_leader():
+        return False
+    job = claim_next()
+    if job is None:
+        return False
+    run_job(job[0], bool(job[1]))
+    return True
+
+
+def run_jobs():
+    while True:
+        try:
+            if run_next():
+                continue
+        except Exception as e:
+            log_to_file(f"Check job runner error: {e}", level="ERROR")
+        wake.wait(CHECK_JOB_POLL_SECONDS)
+        wake.clear()
+
+
+def ensure_runner():
+    global runner_thread
+    with runner_lock:
+        if runner_thread is None or not runner_thread.is_alive():
+            runner_thread = threading.Thread(target=run_jobs, name="check-jobs", daemon=True)
+            runner_thread.start()
+
+
+def get_job(job_id):
+    """Return the job as a dict, or None if it is unknown or has been cleaned up."""
+    row = get_connection(JOBS_DB, SCHEMA).execute(
+        f"SELECT {', '.join(FIELDS)} FROM check_jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    job = dict(zip(FIELDS, row))
+    job["force"] = bool(job["force"])
+    if job["status"] in ("queued", "running") and job["created"] < time.time() - CHECK_JOB_TIMEOUT:
+        job["status"] = "expired"
+    return job
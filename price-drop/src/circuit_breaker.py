@@ -0,0 +1,90 @@
+import threading
+import time
+
+from src.config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+SCORE_ALPHA = 0.2
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after failure_threshold consecutive failures.
+
+    While open every call fails fast with CircuitOpen. After reset_timeout one
+    probe request is let through (half-open); its outcome closes or reopens
+    the circuit. A probe that never reports back is given up on after another
+    reset_timeout, and a new one is let through. score is a moving average of recent outcomes, 1.0 = healthy.
+    """
+
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.probe_started = None
+        self.score = 1.0
+        self.lock = threading.Lock()
+
+    def before(self):
+        """Raise CircuitOpen unless a request to the host may be sent now."""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN and (not self.probing or now - self.probe_started >= self.reset_timeout):
+                self.probing = True
+                self.probe_started = now
+                return
+            raise CircuitOpen(f"Circuit open for {self.host}, failing fast")
+
+    def record_success(self):
+        with self.lock:
+            self.score += SCORE_ALPHA * (1.0 - self.score)
+            self.failures = 0
+            self.state = CLOSED
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.score -= SCORE_ALPHA * self.score
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def report(self):
+        with self.lock:
+            return {"state": self.state, "score": round(self.score, 3), "failures": self.failures}
+
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    with breakers_lock:
+        breaker = breakers.get(host)
+        if breaker is None:
+            breaker = breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def health_report():
+    """{host: {state, score, failures}} for every upstream host contacted so far."""
+    with breakers_lock:
+        hosts = dict(breakers)
+    return {host: breaker.report() for host, breaker in sorted(hosts.items())}
@@ -2,8 +2,12 @@ import os
 
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+YAHOO_BASE_URL = os.getenv("YAHOO_BASE_URL", "https://query1.finance.yahoo.com")
 
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "300"))
+CLOSED_POLL_INTERVAL = int(os.getenv("CLOSED_POLL_INTERVAL", "1800"))
+HOUSEKEEPING_INTERVAL = int(os.getenv("HOUSEKEEPING_INTERVAL", "600"))
 
 ALERT_THRESHOLD_FIRST = -1.0
 ALERT_THRESHOLD_STEP = -0.5
@@ -24,6 +28,62 @@ SYMBOL_NAMES = {
 
 SYMBOLS = list(SYMBOL_NAMES.keys())
 
-LOG_DIR = "/var/log/price-drop"
-DATA_DIR = "/opt/price-drop"
+POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", str(min(30, CHECK_INTERVAL))))
+POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", str(CHECK_INTERVAL * 3)))
+POLL_BUDGET_PER_MINUTE = float(os.getenv("POLL_BUDGET_PER_MINUTE", str(len(SYMBOLS) * 60 / CHECK_INTERVAL)))
+POLL_SAFETY_FACTOR = float(os.getenv("POLL_SAFETY_FACTOR", "0.5"))
+POLL_VOLATILITY_WINDOW = int(os.getenv("POLL_VOLATILITY_WINDOW", "10"))
+
+LOG_DIR = os.getenv("LOG_DIR", "/var/log/price-drop")
+LOG_PAGE_MAX = int(os.getenv("LOG_PAGE_MAX", "1000"))
+LOG_STREAM_SECONDS = int(os.getenv("LOG_STREAM_SECONDS", "45"))
+STATUS_STREAM_SECONDS = int(os.getenv("STATUS_STREAM_SECONDS", "300"))
+STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", "3"))
+STATUS_POLL_SECONDS = float(os.getenv("STATUS_POLL_SECONDS", "1"))
+DATA_DIR = os.getenv("DATA_DIR", "/opt/price-drop")
 ALERT_THRESHOLDS_FILE = f"{DATA_DIR}/alert_thresholds"
+LEADER_LOCK_FILE = f"{DATA_DIR}/scheduler.lock"
+STATUS_DB = f"{DATA_DIR}/status.db"
+HISTORY_DB = f"{DATA_DIR}/history.db"
+NOTIFY_DB = f"{DATA_DIR}/notifications.db"
+JOBS_DB = f"{DATA_DIR}/jobs.db"
+METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/price-drop-metrics")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+ALERT_RULES_FILE = os.getenv("ALERT_RULES_FILE", f"{DATA_DIR}/alert_rules.json")
+SUBSCRIPTIONS_FILE = os.getenv("SUBSCRIPTIONS_FILE", f"{DATA_DIR}/subscriptions.json")
+
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "365"))
+HISTORY_DOWNSAMPLE_AFTER_DAYS = int(os.getenv("HISTORY_DOWNSAMPLE_AFTER_DAYS", "30"))
+HISTORY_DOWNSAMPLE_SECONDS = int(os.getenv("HISTORY_DOWNSAMPLE_SECONDS", "3600"))
+
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "16"))
+FETCH_HOST_CONCURRENCY = int(os.getenv("FETCH_HOST_CONCURRENCY", "8"))
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "30"))
+CHECK_JOB_TIMEOUT = float(os.getenv("CHECK_JOB_TIMEOUT", str(FETCH_DEADLINE * 4)))
+CHECK_JOB_RETENTION = int(os.getenv("CHECK_JOB_RETENTION", "86400"))
+CHECK_JOB_POLL_SECONDS = float(os.getenv("CHECK_JOB_POLL_SECONDS", "1"))
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", str(FETCH_HOST_CONCURRENCY)))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "5"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+QUOTE_PROVIDER = os.getenv("QUOTE_PROVIDER", "chart")
+QUOTE_BATCH_SIZE = int(os.getenv("QUOTE_BATCH_SIZE", "50"))
+QUOTE_PROFILE = os.getenv("QUOTE_PROFILE", "meta")
+ANALYTICS_DRAWDOWN_MINUTES = int(os.getenv("ANALYTICS_DRAWDOWN_MINUTES", "30"))
+ANALYTICS_VELOCITY_MINUTES = int(os.getenv("ANALYTICS_VELOCITY_MINUTES", "5"))
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "30"))
+QUOTE_CACHE_CLOSED_TTL = float(os.getenv("QUOTE_CACHE_CLOSED_TTL", str(CLOSED_POLL_INTERVAL)))
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "1000"))
+
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+TELEGRAM_BURST = int(os.getenv("TELEGRAM_BURST", "3"))
+TELEGRAM_MAX_MESSAGE = 4096
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
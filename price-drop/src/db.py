@@ -0,0 +1,26 @@
+import os
+import sqlite3
+import threading
+
+local = threading.local()
+
+
+def get_connection(path, schema):
+    """Return this thread's connection to the SQLite file at path.
+
+    Connections are opened once per thread and path, in WAL mode so readers
+    in other workers never block the writer, and schema is applied on open.
+    """
+    connections = getattr(local, "connections", None)
+    if connections is None:
+        connections = local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(schema)
+        connections[path] = conn
+    return conn
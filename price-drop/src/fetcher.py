@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.config import FETCH_WORKERS, FETCH_HOST_CONCURRENCY, FETCH_DEADLINE
+
+executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+host_limits = {}
+host_limits_lock = threading.Lock()
+
+
+class FetchTimeout(Exception):
+    pass
+
+
+def get_host_limit(host):
+    with host_limits_lock:
+        if host not in host_limits:
+            host_limits[host] = threading.BoundedSemaphore(FETCH_HOST_CONCURRENCY)
+        return host_limits[host]
+
+
+def run_limited(func, item, host, deadline):
+    remaining = deadline - time.monotonic()
+    limit = get_host_limit(host)
+    if remaining <= 0 or not limit.acquire(timeout=remaining):
+        raise FetchTimeout(f"Deadline exceeded before request to {host} started")
+    try:
+        return func(item)
+    finally:
+        limit.release()
+
+
+def fetch_all(items, func, host, deadline=FETCH_DEADLINE):
+    """Run func(item) for every item concurrently.
+
+    Returns a list of (item, result, error) tuples in the order of items.
+    Items that did not finish within the deadline get a FetchTimeout error.
+    """
+    items = list(items)
+    cycle_deadline = time.monotonic() + deadline
+    futures = [executor.submit(run_limited, func, item, host, cycle_deadline) for item in items]
+    wait(futures, timeout=deadline)
+
+    results = []
+    for item, future in zip(items, futures):
+        if not future.done():
+            future.cancel()
+            results.append((item, None, FetchTimeout(f"No response within {deadline}s")))
+        elif future.exception() is not None:
+            results.append((item, None, future.exception()))
+        else:
+            results.append((item, future.result(), None))
+    return results
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from src.config import (
+    HISTORY_DB, HISTORY_RETENTION_DAYS, HISTORY_DOWNSAMPLE_AFTER_DAYS, HISTORY_DOWNSAMPLE_SECONDS
+)
+from src.db import get_connection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    price REAL NOT NULL,
+    change_pct REAL NOT NULL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID;
+"""
+
+last_compaction_date = None
+
+
+def record_prices(observations):
+    """Store (symbol, ts, price, change_pct) rows from one check cycle in one transaction."""
+    if not observations:
+        return
+    conn = get_connection(HISTORY_DB, SCHEMA)
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR REPLACE INTO prices (symbol, ts, price, change_pct) VALUES (?, ?, ?, ?)",
+            observations
+        )
+
+
+def query_history(symbol, start_ts, end_ts):
+    rows = get_connection(HISTORY_DB, SCHEMA).execute(
+        "SELECT ts, price, change_pct FROM prices WHERE symbol = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+        (symbol, start_ts, end_ts)
+    ).fetchall()
+    return [{"timestamp": ts, "price": price, "change_pct": change_pct} for ts, price, change_pct in rows]
+
+
+def compact_history(now):
+    """Drop samples past retention and average older samples into buckets.
+
+    Runs at most once per day; later calls on the same date return False.
+    """
+    global last_compaction_date
+    if last_compaction_date == now.date():
+        return False
+
+    retention_cutoff = int((now - timedelta(days=HISTORY_RETENTION_DAYS)).timestamp())
+    downsample_cutoff = int((now - timedelta(days=HISTORY_DOWNSAMPLE_AFTER_DAYS)).timestamp())
+    bucket = HISTORY_DOWNSAMPLE_SECONDS
+    downsample_cutoff -= downsample_cutoff % bucket
+
+    conn = get_connection(HISTORY_DB, SCHEMA)
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM prices WHERE ts < ?", (retention_cutoff,))
+        buckets = conn.execute(
+            "SELECT symbol, ts / ? * ? AS bucket_ts, AVG(price), AVG(change_pct) "
+            "FROM prices WHERE ts < ? GROUP BY symbol, bucket_ts "
+            "HAVING COUNT(*) > 1 OR MIN(ts) != bucket_ts",
+            (bucket, bucket, downsample_cutoff)
+        ).fetchall()
+        conn.executemany(
+            "DELETE FROM prices WHERE symbol = ? AND ts >= ? AND ts < ?",
+            [(symbol, bucket_ts, bucket_ts + bucket) for symbol, bucket_ts, _, _ in buckets]
+        )
+        conn.executemany("INSERT INTO prices (symbol, ts, price, change_pct) VALUES (?, ?, ?, ?)", buckets)
+
+    last_compaction_date = now.date()
+    return True
+
+
+def parse_time(value, default):
+    if not value:
+        return default
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp())
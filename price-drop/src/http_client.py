@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.circuit_breaker import get_breaker, CircuitOpen
+from src.metrics import Counter, Histogram
+from src.config import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+request_duration = Histogram("price_drop_upstream_request_duration_seconds", "Upstream HTTP attempt latency by host")
+requests_total = Counter("price_drop_upstream_requests_total", "Upstream HTTP attempts by host and outcome (status code, error, circuit_open)")
+
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def get_session(host):
+    with sessions_lock:
+        session = sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers['User-Agent'] = 'Mozilla/5.0'
+            sessions[host] = session
+        return session
+
+
+def close_sessions():
+    with sessions_lock:
+        for session in sessions.values():
+            session.close()
+        sessions.clear()
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, retries=HTTP_RETRIES, timeout=None, **kwargs):
+    """Send a request over the pooled keep-alive session for the url's host.
+
+    Connection errors and retryable statuses are retried with full-jitter
+    exponential backoff. Read timeouts and retryable statuses are only
+    retried for GET: a 502/504 may come from a proxy after the server
+    acted on a POST, so the response is returned and retrying is left to
+    the caller (the notifier outbox honours Telegram's retry_after). Every attempt is
+    reported to the host's circuit breaker; once it opens, CircuitOpen is
+    raised instead of sending. Other request errors (e.g. a broken chunked
+    body) count as failures but are not retried.
+    """
+    host = urlparse(url).netloc
+    session = get_session(host)
+    breaker = get_breaker(host)
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+    for attempt in range(retries + 1):
+        try:
+            breaker.before()
+        except CircuitOpen:
+            requests_total.inc(host=host, outcome="circuit_open")
+            raise
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            request_duration.observe(time.perf_counter() - started, host=host)
+            requests_total.inc(host=host, outcome="error")
+            breaker.record_failure()
+            retryable = method == "GET" or not isinstance(e, requests.ReadTimeout)
+            if attempt == retries or not retryable:
+                raise
+        except requests.RequestException:
+            request_duration.observe(time.perf_counter() - started, host=host)
+            requests_total.inc(host=host, outcome="error")
+            breaker.record_failure()
+            raise
+        else:
+            request_duration.observe(time.perf_counter() - started, host=host)
+            requests_total.inc(host=host, outcome=str(response.status_code))
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if attempt == retries or method != "GET":
+                return response
+            response.close()
+        time.sleep(backoff_delay(attempt))
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,49 @@
+import fcntl
+import os
+import threading
+
+from src.config import LEADER_LOCK_FILE
+from src.logs import log_to_file
+
+lock_file = None
+lock = threading.Lock()
+
+
+def is_leader():
+    """Return True if this process holds the scheduler lock, trying to take it if free.
+
+    The flock is kept for the lifetime of the process and released by the
+    kernel when it exits, so a surviving worker takes over on its next try.
+    """
+    global lock_file
+    with lock:
+        if lock_file is not None:
+            return True
+
+        os.makedirs(os.path.dirname(LEADER_LOCK_FILE), exist_ok=True)
+        f = open(LEADER_LOCK_FILE, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        lock_file = f
+        log_to_file(f"Scheduler: process {os.getpid()} is now the leader")
+        return True
+
+
+def release_leadership():
+    global lock_file
+    with lock:
+        if lock_file is None:
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            lock_file.close()
+            lock_file = None
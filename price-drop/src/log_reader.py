@@ -0,0 +1,127 @@
+import json
+import os
+import re
+
+from src.config import LOG_DIR
+
+BLOCK_SIZE = 64 * 1024
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def log_path(day):
+    """Return the structured log for day, or the plain text log for days logged before it existed."""
+    if not DATE_PATTERN.match(day):
+        raise ValueError(f"Invalid date: {day}")
+    json_path = os.path.join(LOG_DIR, f"{day}.jsonl")
+    if os.path.exists(json_path):
+        return json_path
+    return os.path.join(LOG_DIR, f"{day}.log")
+
+
+def parse_line(path, line):
+    text = line.decode("utf-8", errors="replace")
+    if path.endswith(".jsonl"):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+    return {"line": text}
+
+
+def format_record(record):
+    if "line" in record:
+        return record["line"]
+    return f"[{record['ts'][11:19]}] {record['message']}"
+
+
+def matches(record, symbol=None, level=None):
+    if record is None:
+        return False
+    if symbol:
+        if "line" in record:
+            if symbol not in record["line"]:
+                return False
+        elif record.get("symbol") != symbol:
+            return False
+    if level and record.get("level", "INFO") != level.upper():
+        return False
+    return True
+
+
+def read_lines_backward(path):
+    """Yield every complete line, newest first, reading the file in blocks from the end."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = None
+        while position > 0:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+            lines = block.split(b"\n")
+            if remainder is None:
+                # a last line without its newline is still being written
+                lines.pop()
+                if not lines:
+                    continue
+            else:
+                lines[-1] += remainder
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if remainder:
+            yield remainder
+
+
+def read_lines_forward(path, since):
+    """Yield (next_offset, line) for every complete line after byte offset since."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(since)
+        offset = since
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            yield offset, line.rstrip(b"\n")
+
+
+def tail(path, limit, offset=0, symbol=None, level=None):
+    """Return (records, has_more) for the newest limit matching lines after skipping offset of them."""
+    records = []
+    skipped = 0
+    for line in read_lines_backward(path):
+        record = parse_line(path, line)
+        if not matches(record, symbol, level):
+            continue
+        if skipped < offset:
+            skipped += 1
+            continue
+        if len(records) == limit:
+            return list(reversed(records)), True
+        records.append(record)
+    return list(reversed(records)), False
+
+
+def read_since(path, since, limit, symbol=None, level=None):
+    """Return (records, cursor) for up to limit matching lines written after byte offset since."""
+    records = []
+    cursor = since
+    for next_offset, line in read_lines_forward(path, since):
+        record = parse_line(path, line)
+        if matches(record, symbol, level):
+            if len(records) == limit:
+                break
+            records.append(record)
+        cursor = next_offset
+    return records, cursor
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
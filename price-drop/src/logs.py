@@ -1,32 +1,141 @@
 from datetime import datetime, timedelta
+import atexit
+import json
 import os
 import glob
+import queue
+import sys
+import threading
 
 from src.config import LOG_DIR
 
+LOG_BATCH_SIZE = 500
+
+log_queue = queue.Queue()
+writer_thread = None
+writer_lock = threading.Lock()
+
+
+class LogWriter(threading.Thread):
+    """Background thread that appends queued records to the day's log files.
+
+    Each day has a text log ({date}.log) and a JSON-lines log ({date}.jsonl).
+    Both stay open (O_APPEND) and are only reopened when the date (or LOG_DIR)
+    changes. Everything queued since the last wake-up is joined and written
+    with a single write() per file, so lines from other workers appending to
+    the same files never interleave mid-line.
+    """
+
+    def __init__(self):
+        super().__init__(name="log-writer", daemon=True)
+        self.key = None
+        self.text_fd = None
+        self.json_fd = None
+
+    def open_files(self, key):
+        self.close_files()
+        log_dir, day = key
+        os.makedirs(log_dir, exist_ok=True)
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        self.text_fd = os.open(os.path.join(log_dir, f"{day}.log"), flags, 0o644)
+        self.json_fd = os.open(os.path.join(log_dir, f"{day}.jsonl"), flags, 0o644)
+        self.key = key
+
+    def close_files(self):
+        for fd in (self.text_fd, self.json_fd):
+            if fd is not None:
+                os.close(fd)
+        self.text_fd = self.json_fd = None
+        self.key = None
+
+    def write_lines(self, key, text_lines, json_lines):
+        if key != self.key:
+            self.open_files(key)
+        os.write(self.text_fd, "".join(text_lines).encode())
+        os.write(self.json_fd, "".join(json_lines).encode())
+
+    def write_batch(self, batch):
+        key = None
+        text_lines = []
+        json_lines = []
+        for day, line, record in batch:
+            if (LOG_DIR, day) != key:
+                if text_lines:
+                    self.write_lines(key, text_lines, json_lines)
+                key = (LOG_DIR, day)
+                text_lines = []
+                json_lines = []
+            text_lines.append(line + "\n")
+            json_lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            sys.stdout.write(line + "\n")
+        if text_lines:
+            self.write_lines(key, text_lines, json_lines)
+        sys.stdout.flush()
+
+    def run(self):
+        while True:
+            batch = []
+            waiters = []
+            item = log_queue.get()
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= LOG_BATCH_SIZE:
+                    break
+                try:
+                    item = log_queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                self.close_files()
+                sys.stderr.write(f"Log writer error: {e}\n")
+            for waiter in waiters:
+                waiter.set()
+
+
+def ensure_writer():
+    global writer_thread
+    if writer_thread is not None and writer_thread.is_alive():
+        return
+    with writer_lock:
+        if writer_thread is None or not writer_thread.is_alive():
+            writer_thread = LogWriter()
+            writer_thread.start()
+
+
+def log_to_file(message, level="INFO", **fields):
+    now = datetime.now()
+    record = {"ts": now.isoformat(timespec='seconds'), "level": level, "message": message}
+    record.update(fields)
+    ensure_writer()
+    log_queue.put((now.strftime('%Y-%m-%d'), f"[{now.strftime('%H:%M:%S')}] {message}", record))
+
+
+def flush_logs(timeout=5):
+    """Block until everything logged so far has been written."""
+    if writer_thread is None or not writer_thread.is_alive():
+        return True
+    done = threading.Event()
+    log_queue.put(done)
+    return done.wait(timeout)
+
+
+atexit.register(flush_logs)
 
-def log_to_file(message):
-    today = datetime.now().strftime('%Y-%m-%d')
-    log_path = os.path.join(LOG_DIR, f"{today}.log")
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR, exist_ok=True)
-        
-    formatted_msg = f"[{timestamp}] {message}"
-    with open(log_path, "a") as f:
-        f.write(formatted_msg + "\n")
-    print(formatted_msg)
 
 def cleanup_old_logs():
     cutoff = datetime.now() - timedelta(days=7)
-    files = glob.glob(os.path.join(LOG_DIR, "*.log"))
+    files = glob.glob(os.path.join(LOG_DIR, "*.log")) + glob.glob(os.path.join(LOG_DIR, "*.jsonl"))
     for f in files:
         try:
-            file_name = os.path.basename(f).replace(".log", "")
-            file_date = datetime.strptime(file_name, '%Y-%m-%d')
+            file_name = os.path.basename(f)
+            file_date = datetime.strptime(os.path.splitext(file_name)[0], '%Y-%m-%d')
             if file_date < cutoff:
                 os.remove(f)
-                log_to_file(f"System: Deleted old log file {file_name}.log")
+                log_to_file(f"System: Deleted old log file {file_name}")
         except Exception as e:
-            log_to_file(f"System: Error during cleanup of {f}: {e}")
\ No newline at end of file
+            log_to_file(f"System: Error during cleanup of {f}: {e}", level="ERROR")
@@ -0,0 +1,132 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from src.config import MARKET_OPEN_HOUR, MARKET_CLOSE_HOUR
+
+
+def easter_sunday(year):
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def nth_weekday(year, month, weekday, n):
+    """n-th (1-based, or -1 for last) given weekday of a month."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def substitute_weekend(days):
+    """Move holidays falling on a weekend to the next free weekday (UK bank holiday rule)."""
+    result = set()
+    for day in sorted(days):
+        while day.weekday() >= 5 or day in result:
+            day += timedelta(days=1)
+        result.add(day)
+    return result
+
+
+def london_holidays(year):
+    easter = easter_sunday(year)
+    return substitute_weekend({
+        date(year, 1, 1), date(year, 12, 25), date(year, 12, 26)
+    }) | {
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        nth_weekday(year, 5, 0, 1),
+        nth_weekday(year, 5, 0, -1),
+        nth_weekday(year, 8, 0, -1),
+    }
+
+
+def xetra_holidays(year):
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1), date(year, 5, 1), date(year, 12, 24), date(year, 12, 25), date(year, 12, 26),
+        date(year, 12, 31), easter - timedelta(days=2), easter + timedelta(days=1),
+    }
+
+
+def warsaw_holidays(year):
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1), date(year, 1, 6), date(year, 5, 1), date(year, 5, 3), date(year, 8, 15),
+        date(year, 11, 1), date(year, 11, 11), date(year, 12, 24), date(year, 12, 25), date(year, 12, 26),
+        date(year, 12, 31), easter - timedelta(days=2), easter + timedelta(days=1), easter + timedelta(days=60),
+    }
+
+
+class Exchange:
+    def __init__(self, name, suffix, timezone, open_time, close_time, holidays=None):
+        self.name = name
+        self.suffix = suffix
+        self.timezone = ZoneInfo(timezone) if timezone else None
+        self.open_time = open_time
+        self.close_time = close_time
+        self.holidays = holidays or (lambda year: set())
+        self.holiday_cache = {}
+
+    def local(self, now):
+        """Convert now (aware, or naive in the server's local time) to exchange time."""
+        return now.astimezone(self.timezone)
+
+    def is_trading_day(self, day):
+        if day.weekday() >= 5:
+            return False
+        if day.year not in self.holiday_cache:
+            self.holiday_cache[day.year] = self.holidays(day.year)
+        return day not in self.holiday_cache[day.year]
+
+    def is_open(self, now):
+        now = self.local(now)
+        return self.is_trading_day(now.date()) and self.open_time <= now.time() < self.close_time
+
+    def next_open(self, now):
+        """Start of the next session (now itself if the market is open)."""
+        now = self.local(now)
+        if self.is_open(now):
+            return now
+        day = now.date()
+        if now.time() >= self.open_time:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, self.open_time, tzinfo=now.tzinfo)
+
+
+EXCHANGES = {
+    "LSE": Exchange("LSE", ".L", "Europe/London", time(8, 0), time(16, 30), london_holidays),
+    "XETRA": Exchange("XETRA", ".DE", "Europe/Berlin", time(9, 0), time(17, 30), xetra_holidays),
+    "GPW": Exchange("GPW", ".WA", "Europe/Warsaw", time(9, 0), time(17, 0), warsaw_holidays),
+}
+
+DEFAULT_EXCHANGE = Exchange("DEFAULT", "", None, time(MARKET_OPEN_HOUR), time(MARKET_CLOSE_HOUR))
+
+
+def exchange_for(symbol):
+    for exchange in EXCHANGES.values():
+        if symbol.endswith(exchange.suffix):
+            return exchange
+    return DEFAULT_EXCHANGE
+
+
+def group_by_exchange(symbols):
+    groups = {}
+    for symbol in symbols:
+        groups.setdefault(exchange_for(symbol).name, []).append(symbol)
+    return groups
+
+
+def open_symbols(symbols, now):
+    return [symbol for symbol in symbols if exchange_for(symbol).is_open(now)]
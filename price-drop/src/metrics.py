@@ -0,0 +1,184 @@
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config import METRICS_DIR, METRICS_FLUSH_SECONDS
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+registry = {}
+values = {}
+values_lock = threading.Lock()
+
+flusher_thread = None
+flusher_lock = threading.Lock()
+dirty = threading.Event()
+process_files = {}
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        registry[name] = self
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, value=1, **labels):
+        key = (self.name, tuple(sorted(labels.items())))
+        with values_lock:
+            values[key] = values.get(key, 0) + value
+        mark_dirty()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = (self.name, tuple(sorted(labels.items())))
+        with values_lock:
+            state = values.get(key)
+            if state is None:
+                state = values[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += 1
+            state[-1] += value
+        mark_dirty()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def mark_dirty():
+    dirty.set()
+    if flusher_thread is None or not flusher_thread.is_alive():
+        ensure_flusher()
+
+
+def ensure_flusher():
+    global flusher_thread
+    with flusher_lock:
+        if flusher_thread is None or not flusher_thread.is_alive():
+            flusher_thread = threading.Thread(target=run_flusher, name="metrics-flusher", daemon=True)
+            flusher_thread.start()
+
+
+def run_flusher():
+    while True:
+        dirty.wait()
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception:
+            pass
+
+
+def process_file():
+    """<pid>-<start ms>.json, so a worker that reuses a dead worker's pid does not overwrite its totals."""
+    pid = os.getpid()
+    name = process_files.get(pid)
+    if name is None:
+        name = process_files[pid] = f"{pid}-{int(time.time() * 1000)}.json"
+    return os.path.join(METRICS_DIR, name)
+
+
+def flush():
+    """Write this process's values to its file in METRICS_DIR, atomically."""
+    dirty.clear()
+    with values_lock:
+        rows = [[name, dict(labels), value] for (name, labels), value in values.items()]
+    if not rows:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, prefix=".metrics.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(rows, f)
+        os.replace(tmp_path, process_file())
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def collect():
+    """Sum the values written by every worker (including ones that have exited) per metric and label set.
+
+    This process's own values are flushed first, so they are always current;
+    other workers' values lag by at most METRICS_FLUSH_SECONDS.
+    """
+    flush()
+    totals = {}
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        try:
+            with open(path, "r") as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in rows:
+            key = (name, tuple(sorted(labels.items())))
+            current = totals.get(key)
+            if current is None:
+                totals[key] = value
+            elif isinstance(value, list):
+                totals[key] = [a + b for a, b in zip(current, value)]
+            else:
+                totals[key] = current + value
+    return totals
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in pairs) + "}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    totals = collect()
+    lines = []
+    for name, metric in sorted(registry.items()):
+        lines.append(f"# HELP {name} {metric.help_text}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for (key_name, labels), value in sorted(totals.items()):
+            if key_name != name:
+                continue
+            if metric.kind == "counter":
+                lines.append(f"{name}{format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {value[-2]}")
+            lines.append(f"{name}_sum{format_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{format_labels(labels)} {value[-2]}")
+    return "\n".join(lines) + "\n"
+
+
+atexit.register(flush)
@@ -0,0 +1,202 @@
+import threading
+import time
+
+from src.config import (
+    NOTIFY_DB, TELEGRAM_CHAT_RATE, TELEGRAM_GLOBAL_RATE, TELEGRAM_BURST,
+    TELEGRAM_MAX_MESSAGE, NOTIFY_MAX_ATTEMPTS
+)
+from src.db import get_connection
+from src.logs import log_to_file
+from src.telegram import deliver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    claimed_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt);
+"""
+
+CLAIM_SECONDS = 60
+
+metrics = {
+    "queued": 0,
+    "sent": 0,
+    "retried": 0,
+    "dropped": 0,
+    "last_send_ms": None,
+    "last_error": None,
+}
+metrics_lock = threading.Lock()
+
+wake = threading.Event()
+sender_thread = None
+sender_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Take one token; return 0 on success or the seconds to wait for the next one."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+chat_buckets = {}
+
+
+def count(name, value=1):
+    with metrics_lock:
+        metrics[name] += value
+
+
+def get_metrics():
+    with metrics_lock:
+        snapshot = dict(metrics)
+    snapshot["pending"] = get_connection(NOTIFY_DB, SCHEMA).execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    return snapshot
+
+
+def build_digest(messages):
+    """Coalesce one cycle's alert messages into as few Telegram messages as fit the size limit."""
+    if len(messages) <= 1:
+        return list(messages)
+    header = f"🚨 {len(messages)} alerts\n\n"
+    digests = []
+    current = header
+    for message in messages:
+        if len(current) + len(message) + 2 > TELEGRAM_MAX_MESSAGE and current != header:
+            digests.append(current.rstrip())
+            current = header
+        current += message + "\n\n"
+    digests.append(current.rstrip())
+    return digests
+
+
+def queue_chat_alerts(chat_messages):
+    """Queue one cycle's alerts as one digest per chat, all inserted in a single transaction."""
+    now = time.time()
+    rows = [
+        (str(chat_id), digest, now, now)
+        for chat_id, messages in chat_messages.items()
+        for digest in build_digest(messages)
+    ]
+    if not rows:
+        return
+    conn = get_connection(NOTIFY_DB, SCHEMA)
+    conn.execute("BEGIN")
+    try:
+        conn.executemany("INSERT INTO outbox (chat_id, text, created, next_attempt) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    count("queued", len(rows))
+    ensure_sender()
+    wake.set()
+
+
+def claim_next(now):
+    return get_connection(NOTIFY_DB, SCHEMA).execute(
+        "UPDATE outbox SET claimed_until = ? WHERE id = ("
+        "SELECT id FROM outbox WHERE next_attempt <= ? AND claimed_until < ? ORDER BY id LIMIT 1"
+        ") RETURNING id, chat_id, text, attempts",
+        (now + CLAIM_SECONDS, now, now)
+    ).fetchone()
+
+
+def next_due_in(now):
+    row = get_connection(NOTIFY_DB, SCHEMA).execute(
+        "SELECT MIN(MAX(next_attempt, claimed_until)) FROM outbox"
+    ).fetchone()
+    if row[0] is None:
+        return None
+    return max(row[0] - now, 0)
+
+
+def wait_for_tokens(chat_id):
+    bucket = chat_buckets.get(chat_id)
+    if bucket is None:
+        bucket = chat_buckets[chat_id] = TokenBucket(TELEGRAM_CHAT_RATE, TELEGRAM_BURST)
+    for limiter in (bucket, global_bucket):
+        delay = limiter.take()
+        while delay:
+            time.sleep(delay)
+            delay = limiter.take()
+
+
+def process_next():
+    """Send the oldest due message. Returns False when nothing is due."""
+    item = claim_next(time.time())
+    if item is None:
+        return False
+
+    message_id, chat_id, text, attempts = item
+    conn = get_connection(NOTIFY_DB, SCHEMA)
+    wait_for_tokens(chat_id)
+    started = time.monotonic()
+    try:
+        deliver(text, chat_id)
+    except Exception as e:
+        attempts += 1
+        with metrics_lock:
+            metrics["last_error"] = str(e)
+        if attempts >= NOTIFY_MAX_ATTEMPTS:
+            conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+            count("dropped")
+            log_to_file(f"Telegram: Dropping message after {attempts} attempts: {e}", level="ERROR")
+        else:
+            delay = getattr(e, "retry_after", None) or min(5 * 2 ** attempts, 600)
+            conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, claimed_until = 0 WHERE id = ?",
+                (attempts, time.time() + delay, message_id)
+            )
+            count("retried")
+            log_to_file(f"Telegram: Send failed, retrying in {delay}s: {e}", level="ERROR")
+        return True
+
+    conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+    with metrics_lock:
+        metrics["sent"] += 1
+        metrics["last_send_ms"] = round((time.monotonic() - started) * 1000, 1)
+    log_to_file("Telegram: Notification sent successfully")
+    return True
+
+
+def run_sender():
+    while True:
+        try:
+            if process_next():
+                continue
+            timeout = next_due_in(time.time())
+        except Exception as e:
+            log_to_file(f"Telegram: Sender error: {e}", level="ERROR")
+            timeout = 30
+        wake.wait(30 if timeout is None else min(timeout, 30))
+        wake.clear()
+
+
+def ensure_sender():
+    global sender_thread
+    with sender_lock:
+        if sender_thread is None or not sender_thread.is_alive():
+            sender_thread = threading.Thread(target=run_sender, name="telegram-sender", daemon=True)
+            sender_thread.start()
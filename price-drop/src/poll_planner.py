@@ -0,0 +1,82 @@
+import math
+import threading
+from collections import deque
+
+from src.config import (
+    CHECK_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_BUDGET_PER_MINUTE,
+    POLL_SAFETY_FACTOR, POLL_VOLATILITY_WINDOW
+)
+from src import change_tracker
+
+samples = {}
+samples_lock = threading.Lock()
+
+
+def record_sample(symbol, ts, change_pct):
+    with samples_lock:
+        window = samples.get(symbol)
+        if window is None:
+            window = samples[symbol] = deque(maxlen=POLL_VOLATILITY_WINDOW)
+        window.append((ts, change_pct))
+
+
+def recent_speed(symbol):
+    """Average absolute move of change_pct per second over the recent samples, or None without history."""
+    with samples_lock:
+        window = list(samples.get(symbol, ()))
+    if len(window) < 2 or window[-1][0] <= window[0][0]:
+        return None
+    moved = sum(abs(b[1] - a[1]) for a, b in zip(window, window[1:]))
+    return moved / (window[-1][0] - window[0][0])
+
+
+def alert_distance(result, symbol_rules, last_sent):
+    """Smallest distance (in the rule's own units) from the quote to a level that has not alerted yet.
+
+    Only rules measured in percent count; volatility (σ) and velocity
+    (%/min) rules are covered by the speed estimate instead.
+    """
+    distance = math.inf
+    if symbol_rules is None:
+        return distance
+    for rule in symbol_rules.rules:
+        if rule.name.startswith("volatility") or rule.name == "velocity":
+            continue
+        value = rule.measure(result)
+        if value is None:
+            continue
+        last = last_sent.get(rule.state_key(result["symbol"]))
+        next_level = rule.first if last is None or not rule.reached(last) else last + rule.step
+        distance = min(distance, max((next_level - value) / math.copysign(1, rule.step), 0.0))
+    return distance
+
+
+def desired_interval(result, symbol_rules, last_sent):
+    """Poll often enough to see a symbol about POLL_SAFETY_FACTOR of the way to its next alert level."""
+    if result is None or result.get("status") != "checked":
+        return CHECK_INTERVAL
+    speed = recent_speed(result["symbol"])
+    if speed is None:
+        return CHECK_INTERVAL
+    distance = alert_distance(result, symbol_rules, last_sent)
+    if speed == 0 or math.isinf(distance):
+        return POLL_MAX_INTERVAL
+    return min(max(distance / speed * POLL_SAFETY_FACTOR, POLL_MIN_INTERVAL), POLL_MAX_INTERVAL)
+
+
+def plan(symbols, rules, last_sent):
+    """Set each symbol's next poll time, scaling all intervals so the total stays within POLL_BUDGET_PER_MINUTE.
+
+    symbols are the symbols currently in session; returns {symbol: interval}.
+    """
+    intervals = {
+        symbol: desired_interval(change_tracker.get_result(symbol), rules.get(symbol), last_sent)
+        for symbol in symbols
+    }
+    rate = sum(60.0 / interval for interval in intervals.values())
+    if rate > POLL_BUDGET_PER_MINUTE:
+        scale = rate / POLL_BUDGET_PER_MINUTE
+        intervals = {symbol: interval * scale for symbol, interval in intervals.items()}
+    for symbol, interval in intervals.items():
+        change_tracker.schedule(symbol, interval)
+    return intervals
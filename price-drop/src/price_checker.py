@@ -1,109 +1,246 @@
-import requests
+import threading
+import time
 from datetime import datetime
 
-from src.config import (
-    SYMBOLS, SYMBOL_NAMES, ALERT_THRESHOLD_FIRST, ALERT_THRESHOLD_STEP,
-    MARKET_OPEN_HOUR, MARKET_CLOSE_HOUR
-)
+from src.config import SYMBOLS, SYMBOL_NAMES, TELEGRAM_CHAT_ID, HOUSEKEEPING_INTERVAL
 from src.logs import log_to_file, cleanup_old_logs
-from src.alerts import get_alert_thresholds, save_alert_threshold, cleanup_alert_file
-from src.telegram import send_telegram
+from src.alerts import (
+    get_alert_thresholds, record_alert_threshold, flush_alert_thresholds, discard_alert_thresholds,
+    cleanup_alert_file
+)
+from src.notifier import queue_chat_alerts
+from src.quotes import get_provider
+from src.quote_cache import quote_cache
+from src import status_store
+from src.history import record_prices, compact_history
+from src.alert_engine import ladder_threshold, evaluate_alerts, add_zscores
+from src.rules import get_rules
+from src.subscriptions import get_subscriptions
+from src import change_tracker, poll_planner
+from src.circuit_breaker import health_report
+from src.market_calendar import open_symbols
+from src.analytics import intraday_analytics
+from src.metrics import Counter, Histogram
+
+check_duration = Histogram("price_drop_check_duration_seconds", "Duration of check cycles that polled quotes")
+checks_total = Counter("price_drop_checks_total", "Check cycles by result (ok, idle, skipped, error)")
+symbols_polled = Counter("price_drop_symbols_polled_total", "Symbols fetched by check cycles")
+quote_errors = Counter("price_drop_quote_errors_total", "Failed quote fetches by symbol")
+
+ALERT_TITLES = {
+    "drop": "📉 Price Alert",
+    "drop_from_high": "📉 Drop From Day High",
+    "rise": "📈 Price Rise",
+    "volatility_down": "⚡ Volatility Alert",
+    "volatility_up": "⚡ Volatility Alert",
+    "vwap_deviation": "📉 Below VWAP",
+    "drawdown": "📉 Intraday Drawdown",
+    "velocity": "⏬ Fast Move",
+}
 
-last_check_time = None
-last_check_status = None
+INTRADAY_LABELS = {
+    "vwap_deviation": "From VWAP: {:.4f}%",
+    "drawdown": "Drawdown: {:.4f}%",
+    "velocity": "Velocity: {:+.4f}%/min",
+}
+
+
+last_housekeeping = None
+cycle_lock = threading.Lock()
 
 
 def get_next_threshold(current_change_pct):
-    threshold = ALERT_THRESHOLD_FIRST
-    while threshold >= current_change_pct:
-        threshold += ALERT_THRESHOLD_STEP
-    return threshold - ALERT_THRESHOLD_STEP
+    return ladder_threshold(current_change_pct)
 
 
 def get_last_check_status():
-    return last_check_status
+    return status_store.load()[1]
+
+
+def upstream_states(upstream):
+    return {host: health["state"] for host, health in (upstream or {}).items()}
+
+
+def format_alert(result, alert):
+    lines = [
+        f"{ALERT_TITLES[alert['rule']]}: {result['name']}",
+        f"Current Price: {result['price']}",
+        f"Change: {result['change_pct']:.4f}%"
+    ]
+    if alert["rule"] == "drop_from_high":
+        lines.append(f"From Day High: {alert['value']:.4f}%")
+    elif alert["rule"].startswith("volatility"):
+        lines.append(f"Deviation: {alert['value']:+.2f}σ")
+    elif alert["rule"] in INTRADAY_LABELS:
+        lines.append(INTRADAY_LABELS[alert["rule"]].format(alert["value"]))
+    return "\n".join(lines)
+
+
+def record_alert(result, alert):
+    record_alert_threshold(alert["key"], alert["level"])
+    result["alert_sent"] = True
+    result.setdefault("alerts", []).append({"rule": alert["rule"], "level": alert["level"]})
+    if alert["rule"] == "drop":
+        result["threshold"] = alert["level"]
+    log_to_file(
+        f"Alert queued for {result['name']}: {alert['rule']} threshold {alert['level']}",
+        level="WARNING", symbol=result["symbol"], rule=alert["rule"], threshold=alert["level"]
+    )
+
+
+def housekeeping(now):
+    """Remove yesterday's alert file and week-old logs, at most every HOUSEKEEPING_INTERVAL seconds."""
+    global last_housekeeping
+    if last_housekeeping is not None and now.timestamp() - last_housekeeping < HOUSEKEEPING_INTERVAL:
+        return
+    last_housekeeping = now.timestamp()
+    cleanup_alert_file()
+    cleanup_old_logs()
+
+
+def check_prices(symbols=None, manual=False, force=False):
+    """Run one check cycle.
 
+    Scheduled cycles poll only the symbols that are due and return without
+    any work when none are; manual ones poll every open symbol, served from
+    the quote cache unless force is set. Cycles never overlap: a manual
+    check arriving during a scheduled cycle waits for it and then reuses
+    the quotes it just cached. Returns the error message if the cycle
+    failed (it is also published as success: false), else None.
+    """
+    with cycle_lock:
+        return run_cycle(symbols, manual, force)
 
-def check_prices():
-    global last_check_time, last_check_status
-    
+
+def run_cycle(symbols, manual, force):
+    started = time.perf_counter()
+    polled = []
     try:
         current_time = datetime.now()
-        hour = current_time.hour
-        if hour < MARKET_OPEN_HOUR or hour >= MARKET_CLOSE_HOUR:
+        candidates = open_symbols(SYMBOLS if symbols is None else symbols, current_time)
+        if not candidates:
             log_to_file(f"Market closed ({current_time.strftime('%H:%M:%S')}). Skipping check.")
+            checks_total.inc(result="skipped")
+            return
+
+        observed_at = int(current_time.timestamp())
+        symbols = candidates if manual else [s for s in candidates if change_tracker.should_poll(s, observed_at)]
+        if not symbols:
+            checks_total.inc(result="idle")
             return
 
         log_to_file(f"Check prices triggered at {current_time.strftime('%H:%M:%S')}")
 
-        cleanup_alert_file()
+        polled = symbols
+        housekeeping(current_time)
         alert_thresholds = get_alert_thresholds()
-        cleanup_old_logs()
 
-        results = []
+        observations = []
+        updated = []
+        symbols_polled.inc(len(symbols))
 
-        for symbol in SYMBOLS:
+        for symbol, meta, error in quote_cache.fetch(symbols, get_provider().fetch, current_time, force):
             try:
-                url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=1m&range=1d"
-                headers = {'User-Agent': 'Mozilla/5.0'}
-                response = requests.get(url, headers=headers, timeout=10).json()
-                meta = response['chart']['result'][0]['meta']
-                
+                if error is not None:
+                    raise error
+                if not change_tracker.observe(symbol, meta, observed_at):
+                    continue
+
                 current_price = meta['regularMarketPrice']
                 previous_close = meta['previousClose']
                 change_pct = ((current_price - previous_close) / previous_close) * 100
 
                 symbol_name = SYMBOL_NAMES.get(symbol, symbol)
-                log_to_file(f"{symbol} ({symbol_name}): {current_price} (Change: {change_pct:.2f}%)")
+                log_to_file(
+                    f"{symbol} ({symbol_name}): {current_price} (Change: {change_pct:.2f}%)",
+                    symbol=symbol, price=current_price, change_pct=round(change_pct, 4)
+                )
                 
                 result = {
                     "symbol": symbol,
                     "name": symbol_name,
                     "price": current_price,
                     "change_pct": change_pct,
-                    "status": "checked"
+                    "day_high": meta.get('regularMarketDayHigh'),
+                    "status": "checked",
+                    "alert_sent": False
                 }
+                if meta.get('candles'):
+                    intraday = intraday_analytics(meta['candles'], current_price)
+                    if intraday is not None:
+                        result["intraday"] = intraday
+                observations.append((symbol, observed_at, current_price, change_pct))
 
-                if change_pct <= ALERT_THRESHOLD_FIRST:
-                    last_sent_threshold = alert_thresholds.get(symbol, 0.0)
-                    current_threshold = get_next_threshold(change_pct)
-                    if current_threshold < last_sent_threshold:
-                        message = (
-                            f"📉 Price Alert: {symbol_name}\n"
-                            f"Current Price: {current_price}\n"
-                            f"Change: {change_pct:.4f}%"
-                        )
-                        send_telegram(message)
-                        save_alert_threshold(symbol, current_threshold)
-                        result["alert_sent"] = True
-                        result["threshold"] = current_threshold
-                        log_to_file(f"Alert sent for {symbol_name}: threshold {current_threshold}")
-                    else:
-                        result["alert_sent"] = False
-                else:
-                    result["alert_sent"] = False
-                    
-                results.append(result)
-                
             except Exception as e:
-                log_to_file(f"Error checking {symbol}: {e}")
-                results.append({
+                log_to_file(f"Error checking {symbol}: {e}", level="ERROR", symbol=symbol)
+                quote_errors.inc(symbol=symbol)
+                change_tracker.mark_polled(symbol, observed_at)
+                result = {
                     "symbol": symbol,
                     "status": "error",
                     "error": str(e)
-                })
-
-        last_check_time = datetime.now().isoformat()
-        last_check_status = {
-            "timestamp": last_check_time,
-            "results": results,
-            "success": True
-        }
-        
+                }
+            change_tracker.set_result(symbol, result)
+            updated.append(result)
+
+        for symbol in symbols:
+            result = change_tracker.get_result(symbol)
+            if result is not None and result["status"] == "checked":
+                poll_planner.record_sample(symbol, observed_at, result["change_pct"])
+
+        log_to_file(f"Check cycle: polled {len(symbols)} of {len(SYMBOLS)} symbols, {len(updated)} changed")
+
+        checked = {r["symbol"]: r for r in updated if r["status"] == "checked"}
+        rules = get_rules()
+        subscriptions = get_subscriptions()
+        windows = subscriptions.windows()
+        quotes = add_zscores(checked.values(), {
+            symbol: sorted(set(rules[symbol].windows if symbol in rules else ()) | set(windows.get(symbol, ())))
+            for symbol in checked
+        })
+
+        chat_messages = {}
+        for alert in evaluate_alerts(quotes, rules, alert_thresholds):
+            chat_messages.setdefault(TELEGRAM_CHAT_ID, []).append(format_alert(checked[alert["symbol"]], alert))
+            record_alert(checked[alert["symbol"]], alert)
+        for alert, chats in subscriptions.evaluate(quotes, alert_thresholds):
+            message = format_alert(checked[alert["symbol"]], alert)
+            record_alert_threshold(alert["key"], alert["level"])
+            for chat_id in chats:
+                chat_messages.setdefault(chat_id, []).append(message)
+        if chat_messages:
+            queue_chat_alerts(chat_messages)
+        flush_alert_thresholds()
+        poll_planner.plan(open_symbols(SYMBOLS, current_time), rules, get_alert_thresholds())
+
+        try:
+            record_prices(observations)
+            compact_history(current_time)
+        except Exception as e:
+            log_to_file(f"Error writing price history: {e}", level="ERROR")
+
+        upstream = health_report()
+        last_status = get_last_check_status()
+        if updated or last_status is None or not last_status.get("success") or upstream_states(last_status.get("upstream")) != upstream_states(upstream):
+            results = [change_tracker.get_result(s) for s in SYMBOLS if change_tracker.get_result(s) is not None]
+            status_store.publish({
+                "timestamp": datetime.now().isoformat(),
+                "results": results,
+                "upstream": upstream,
+                "success": True
+            })
+        checks_total.inc(result="ok")
+        check_duration.observe(time.perf_counter() - started)
+
     except Exception as e:
-        log_to_file(f"Critical error in check_prices: {e}")
-        last_check_status = {
+        log_to_file(f"Critical error in check_prices: {e}", level="ERROR")
+        change_tracker.forget(polled)
+        discard_alert_thresholds()
+        checks_total.inc(result="error")
+        status_store.publish({
             "timestamp": datetime.now().isoformat(),
             "error": str(e),
+            "upstream": health_report(),
             "success": False
-        }
+        })
+        return str(e)
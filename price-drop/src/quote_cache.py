@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from src.config import QUOTE_CACHE_TTL, QUOTE_CACHE_CLOSED_TTL, QUOTE_CACHE_SIZE, FETCH_DEADLINE
+from src.fetcher import FetchTimeout
+from src.market_calendar import exchange_for
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.meta = None
+        self.error = None
+
+
+class QuoteCache:
+    """LRU cache of quote metas with a per-symbol TTL and single-flight fetching.
+
+    Concurrent callers asking for the same missing symbol share one upstream
+    fetch: the first caller fetches, the others wait for its result. The
+    cache lives in each process; scheduled and manual checks both run in
+    the leader (see check_jobs), so they share the leader's cache.
+    """
+
+    def __init__(self, max_entries=QUOTE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl(self, symbol, now):
+        """Quotes of a closed exchange do not move, so they stay fresh much longer."""
+        return QUOTE_CACHE_TTL if exchange_for(symbol).is_open(now) else QUOTE_CACHE_CLOSED_TTL
+
+    def lookup(self, symbol, now_ts):
+        entry = self.entries.get(symbol)
+        if entry is None or entry[0] <= now_ts:
+            return None
+        self.entries.move_to_end(symbol)
+        return entry[1]
+
+    def store(self, symbol, meta, expires):
+        self.entries[symbol] = (expires, meta)
+        self.entries.move_to_end(symbol)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def fetch(self, symbols, fetch, now=None, force=False):
+        """Return [(symbol, meta, error)] in input order, calling fetch(symbols) only for stale symbols.
+
+        fetch has the provider's fetch signature. force skips the cached
+        value but still joins a fetch already in flight.
+        """
+        now = now or datetime.now()
+        now_ts = now.timestamp()
+        cached, owned, waiting = {}, [], {}
+        with self.lock:
+            for symbol in symbols:
+                meta = None if force else self.lookup(symbol, now_ts)
+                if meta is not None:
+                    cached[symbol] = meta
+                    self.hits += 1
+                elif symbol in self.inflight:
+                    waiting[symbol] = self.inflight[symbol]
+                    self.hits += 1
+                else:
+                    self.inflight[symbol] = Flight()
+                    owned.append(symbol)
+                    self.misses += 1
+
+        results = {symbol: (symbol, meta, None) for symbol, meta in cached.items()}
+        try:
+            fetched = fetch(owned) if owned else []
+        except Exception as e:
+            fetched = [(symbol, None, e) for symbol in owned]
+        with self.lock:
+            for symbol, meta, error in fetched:
+                if error is None:
+                    self.store(symbol, meta, now_ts + self.ttl(symbol, now))
+                flight = self.inflight.pop(symbol, None)
+                if flight is not None:
+                    flight.meta, flight.error = meta, error
+                    flight.done.set()
+                results[symbol] = (symbol, meta, error)
+            for symbol in owned:
+                flight = self.inflight.pop(symbol, None)
+                if flight is not None:
+                    flight.error = KeyError(f"No quote returned for {symbol}")
+                    flight.done.set()
+                    results[symbol] = (symbol, None, flight.error)
+
+        for symbol, flight in waiting.items():
+            if flight.done.wait(FETCH_DEADLINE):
+                results[symbol] = (symbol, flight.meta, flight.error)
+            else:
+                results[symbol] = (symbol, None, FetchTimeout(f"Shared fetch of {symbol} did not finish"))
+        return [results[symbol] for symbol in symbols]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+quote_cache = QuoteCache()
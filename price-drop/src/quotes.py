@@ -0,0 +1,172 @@
+import codecs
+import json
+from urllib.parse import urlparse
+
+from src import http_client
+from src.config import QUOTE_PROVIDER, QUOTE_BATCH_SIZE, QUOTE_PROFILE, YAHOO_BASE_URL
+from src.fetcher import fetch_all
+
+YAHOO_HOST = urlparse(YAHOO_BASE_URL).netloc
+CHART_URL = f"{YAHOO_BASE_URL}/v8/finance/chart"
+BATCH_URL = f"{YAHOO_BASE_URL}/v7/finance/quote"
+
+CHART_PROFILES = {
+    "full": "interval=1m&range=1d",
+    "meta": "interval=1d&range=1d",
+}
+
+META_KEY = '"meta":'
+
+
+def extract_meta(data):
+    result = data['chart']['result']
+    if not result:
+        raise ValueError(f"No chart data: {data['chart'].get('error')}")
+    return result[0]['meta']
+
+
+def extract_candles(data):
+    """The 1-minute OHLCV arrays of a full chart response."""
+    result = data['chart']['result'][0]
+    quote = (result.get('indicators', {}).get('quote') or [{}])[0]
+    timestamps = result.get('timestamp') or []
+    return {
+        "timestamp": timestamps,
+        "high": quote.get("high") or [None] * len(timestamps),
+        "low": quote.get("low") or [None] * len(timestamps),
+        "close": quote.get("close") or [None] * len(timestamps),
+        "volume": quote.get("volume") or [None] * len(timestamps),
+    }
+
+
+def read_meta(chunks):
+    """Decode only the chart meta object from a streamed chart response.
+
+    JSON decoding stops as soon as the meta object is complete. The
+    remaining chunks are still read (not decoded) so the keep-alive
+    connection can go back to the pool.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    json_decoder = json.JSONDecoder()
+    text = ""
+    start = -1
+    meta = None
+
+    for chunk in chunks:
+        if meta is not None:
+            continue
+        text += text_decoder.decode(chunk)
+        if start < 0:
+            start = text.find(META_KEY)
+            if start < 0:
+                continue
+            start += len(META_KEY)
+        while start < len(text) and text[start].isspace():
+            start += 1
+        try:
+            meta, _ = json_decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+
+    if meta is None:
+        return extract_meta(json.loads(text))
+    return meta
+
+
+def quote_to_meta(quote):
+    return {
+        "symbol": quote.get("symbol"),
+        "regularMarketPrice": quote.get("regularMarketPrice"),
+        "previousClose": quote.get("regularMarketPreviousClose"),
+        "regularMarketDayHigh": quote.get("regularMarketDayHigh"),
+        "regularMarketTime": quote.get("regularMarketTime"),
+        "exchangeTimezoneName": quote.get("exchangeTimezoneName"),
+    }
+
+
+class ChartQuoteProvider:
+    """One v8 chart request per symbol, fetched concurrently.
+
+    The "meta" profile asks for a single daily candle and stream-parses
+    only the meta object; "full" downloads the whole 1-minute series and
+    returns it under meta["candles"] for the intraday analytics.
+    """
+
+    def __init__(self, profile=QUOTE_PROFILE):
+        self.profile = profile
+        self.query = CHART_PROFILES[profile]
+
+    def fetch_one(self, symbol):
+        url = f"{CHART_URL}/{symbol}?{self.query}"
+        if self.profile == "full":
+            data = http_client.get(url).json()
+            meta = extract_meta(data)
+            meta['candles'] = extract_candles(data)
+        else:
+            with http_client.get(url, stream=True) as response:
+                meta = read_meta(response.iter_content(chunk_size=1024))
+        meta.setdefault('previousClose', meta.get('chartPreviousClose'))
+        return meta
+
+    def fetch(self, symbols):
+        return fetch_all(symbols, self.fetch_one, YAHOO_HOST)
+
+
+class BatchQuoteProvider:
+    """Multi-symbol v7 quote requests, falling back to chart calls.
+
+    Symbols are split into chunks of batch_size and each chunk is one
+    request. Any symbol missing from the batch replies (unknown to the
+    endpoint, or its whole chunk failed) is fetched with the fallback.
+    """
+
+    def __init__(self, batch_size=QUOTE_BATCH_SIZE, fallback=None):
+        self.batch_size = batch_size
+        self.fallback = fallback or ChartQuoteProvider()
+
+    def fetch_batch(self, symbols):
+        response = http_client.get(BATCH_URL, params={"symbols": ",".join(symbols)})
+        response.raise_for_status()
+        quotes = response.json()['quoteResponse']['result']
+        return {
+            quote["symbol"]: quote_to_meta(quote)
+            for quote in quotes
+            if quote.get("regularMarketPrice") is not None
+            and quote.get("regularMarketPreviousClose") is not None
+        }
+
+    def fetch(self, symbols):
+        symbols = list(symbols)
+        chunks = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+
+        found = {}
+        for _, batch, error in fetch_all(chunks, self.fetch_batch, YAHOO_HOST):
+            if error is None:
+                found.update(batch)
+
+        missing = [symbol for symbol in symbols if symbol not in found]
+        fallback = {symbol: (meta, error) for symbol, meta, error in self.fallback.fetch(missing)}
+
+        results = []
+        for symbol in symbols:
+            if symbol in found:
+                results.append((symbol, found[symbol], None))
+            else:
+                meta, error = fallback[symbol]
+                results.append((symbol, meta, error))
+        return results
+
+
+providers = {
+    "chart": ChartQuoteProvider,
+    "batch": BatchQuoteProvider,
+}
+
+provider = None
+
+
+def get_provider():
+    global provider
+    if provider is None:
+        provider = providers[QUOTE_PROVIDER]()
+    return provider
@@ -1,24 +1,81 @@
 import os
+import json
+import time
+import threading
 from datetime import datetime
-from flask import Blueprint, jsonify, render_template
+from flask import Blueprint, Response, g, jsonify, render_template, request
 
-from src.config import SYMBOLS, LOG_DIR
+from src.config import SYMBOLS, LOG_PAGE_MAX, LOG_STREAM_SECONDS, STATUS_STREAM_SECONDS, STREAM_MAX_CONNECTIONS
 from src.logs import log_to_file
 from src.telegram import send_telegram
-from src.price_checker import check_prices, get_last_check_status
+from src.price_checker import get_last_check_status
+from src import check_jobs
+from src import status_store, status_feed
+from src.notifier import get_metrics as get_notification_metrics
+from src.circuit_breaker import health_report
+from src import metrics
+from src.boot import readiness
+from src.history import query_history, parse_time
+from src.log_reader import log_path, tail, read_since, format_record, file_size
 
 api = Blueprint('api', __name__)
 
+route_duration = metrics.Histogram("price_drop_http_request_duration_seconds", "Time to produce a response, by route")
+route_requests = metrics.Counter("price_drop_http_requests_total", "HTTP requests by route, method and status")
+
+stream_slots = threading.BoundedSemaphore(STREAM_MAX_CONNECTIONS)
+
+
+@api.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@api.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    route_duration.observe(time.perf_counter() - g.request_started, route=route)
+    route_requests.inc(route=route, method=request.method, status=str(response.status_code))
+    return response
+
+
+def event_stream(events):
+    """SSE response holding one of the worker's stream slots until the client disconnects.
+
+    Each open stream pins a gunicorn thread, so only STREAM_MAX_CONNECTIONS
+    may run per worker; beyond that clients get 503 and fall back to polling.
+    """
+    if not stream_slots.acquire(blocking=False):
+        return jsonify({
+            "error": "Too many open streams, poll instead"
+        }), 503
+    response = Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    response.call_on_close(stream_slots.release)
+    return response
+
 
 @api.route('/health', methods=['GET'])
 def health():
+    """Liveness only: never touches the shared stores, so a slow status.db cannot restart the pod."""
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "service": "price-drop-tracker"
+        "service": "price-drop-tracker",
+        "upstream": health_report()
     }), 200
 
 
+@api.route('/ready', methods=['GET'])
+def ready():
+    state = readiness()
+    return jsonify(dict(state, status="ready" if state["ready"] else "starting")), 200 if state["ready"] else 503
+
+
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @api.route('/', methods=['GET'])
 def index():
     return render_template('index.html')
@@ -26,55 +83,157 @@ def index():
 
 @api.route('/check-prices', methods=['POST'])
 def check_prices_endpoint():
-    log_to_file("Manual price check triggered via API")
-    check_prices()
-    
-    return jsonify({
-        "message": "Price check completed",
-        "last_check": get_last_check_status()
-    }), 200
+    force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+    job_id, merged = check_jobs.submit(force)
+    if merged:
+        log_to_file(f"Manual price check merged into running job {job_id}")
+    else:
+        log_to_file(f"Manual price check triggered via API{' (forced refresh)' if force else ''}, job {job_id}")
+
+    response = jsonify({
+        "message": "Price check already in progress" if merged else "Price check queued",
+        "job_id": job_id,
+        "merged": merged,
+        "status_url": f"/check-prices/{job_id}"
+    })
+    response.headers['Location'] = f"/check-prices/{job_id}"
+    return response, 202
+
+
+@api.route('/check-prices/<job_id>', methods=['GET'])
+def check_prices_job(job_id):
+    job = check_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({
+            "error": f"Unknown check job: {job_id}"
+        }), 404
+    if job["status"] == "done":
+        job["last_check"] = get_last_check_status()
+    return jsonify(job), 200
 
 
 @api.route('/status', methods=['GET'])
 def status():
-    last_check_status = get_last_check_status()
+    version, last_check_status, body = status_store.load()
     if last_check_status is None:
         return jsonify({
             "status": "no_checks_yet",
             "message": "No price checks have been performed yet"
         }), 200
-    
-    return jsonify(last_check_status), 200
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(str(version))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@api.route('/status/stream', methods=['GET'])
+def status_stream():
+    """Server-sent events: a full snapshot first, then per-symbol diffs as cycles complete."""
+    version = request.headers.get('Last-Event-ID', type=int)
+    status_feed.refresh()
+
+    def generate(version):
+        deadline = time.monotonic() + STATUS_STREAM_SECONDS
+        yield "retry: 2000\n\n"
+        current = status_feed.latest
+        if current[1] is not None and current[0] != version:
+            yield f"id: {current[0]}\nevent: snapshot\ndata: {current[2]}\n\n"
+            version = current[0]
+        while time.monotonic() < deadline:
+            snapshot, diff = status_feed.wait_for_update(version, timeout=min(15, deadline - time.monotonic()))
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+                continue
+            if diff is None:
+                yield f"id: {snapshot[0]}\nevent: snapshot\ndata: {snapshot[2]}\n\n"
+            else:
+                yield f"id: {snapshot[0]}\nevent: diff\ndata: {json.dumps(diff)}\n\n"
+            version = snapshot[0]
+
+    return event_stream(generate(version))
 
 
 @api.route('/logs', methods=['GET'])
 def get_logs():
     try:
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_path = f"{LOG_DIR}/{today}.log"
-        
-        if not os.path.exists(log_path):
+        day = request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+        path = log_path(day)
+        limit = max(1, min(request.args.get('limit', 100, type=int), LOG_PAGE_MAX))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        since = request.args.get('since', type=int)
+        symbol = request.args.get('symbol')
+        level = request.args.get('level')
+
+        if not os.path.exists(path):
             return jsonify({
-                "date": today,
+                "date": day,
                 "logs": [],
-                "message": "No logs for today"
+                "cursor": 0,
+                "message": "No logs for this day"
             }), 200
-        
-        with open(log_path, 'r') as f:
-            logs = f.readlines()
-        
+
+        if since is not None:
+            records, cursor = read_since(path, since, limit, symbol, level)
+            has_more = False
+        else:
+            cursor = file_size(path)
+            records, has_more = tail(path, limit, offset, symbol, level)
+
+        response = {
+            "date": day,
+            "logs": [format_record(record) for record in records],
+            "count": len(records),
+            "cursor": cursor
+        }
+        if has_more:
+            response["next_offset"] = offset + len(records)
+        return jsonify(response), 200
+
+    except ValueError as e:
         return jsonify({
-            "date": today,
-            "logs": logs,
-            "count": len(logs)
-        }), 200
-        
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "error": str(e)
         }), 500
 
 
+@api.route('/logs/stream', methods=['GET'])
+def stream_logs():
+    """Server-sent events with every new log line; each event id is the resume cursor."""
+    day = datetime.now().strftime('%Y-%m-%d')
+    path = log_path(day)
+    symbol = request.args.get('symbol')
+    level = request.args.get('level')
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', type=int)
+    if since is None or since > file_size(path):
+        since = file_size(path) if since is None else 0
+
+    def generate(cursor):
+        deadline = time.monotonic() + LOG_STREAM_SECONDS
+        last_event = time.monotonic()
+        yield "retry: 1000\n\n"
+        while time.monotonic() < deadline:
+            records, cursor_after = read_since(path, cursor, LOG_PAGE_MAX, symbol, level)
+            for i, record in enumerate(records):
+                event_id = f"id: {cursor_after}\n" if i == len(records) - 1 else ""
+                yield f"{event_id}data: {json.dumps(record, ensure_ascii=False)}\n\n"
+            if records:
+                last_event = time.monotonic()
+            elif time.monotonic() - last_event >= 15:
+                yield ": keep-alive\n\n"
+                last_event = time.monotonic()
+            if cursor_after == cursor:
+                time.sleep(1)
+            cursor = cursor_after
+
+    return event_stream(generate(since))
+
+
 @api.route('/symbols', methods=['GET'])
 def get_symbols():
     return jsonify({
@@ -83,6 +242,32 @@ def get_symbols():
     }), 200
 
 
+@api.route('/history/<symbol>', methods=['GET'])
+def get_history(symbol):
+    now = int(datetime.now().timestamp())
+    try:
+        end_ts = parse_time(request.args.get('to'), now)
+        start_ts = parse_time(request.args.get('from'), end_ts - 86400)
+    except ValueError as e:
+        return jsonify({
+            "error": f"Invalid time range: {e}"
+        }), 400
+
+    points = query_history(symbol, start_ts, end_ts)
+    return jsonify({
+        "symbol": symbol,
+        "from": start_ts,
+        "to": end_ts,
+        "points": points,
+        "count": len(points)
+    }), 200
+
+
+@api.route('/notifications', methods=['GET'])
+def notifications():
+    return jsonify(get_notification_metrics()), 200
+
+
 @api.route('/send-status-telegram', methods=['POST'])
 def send_status_telegram():
     try:
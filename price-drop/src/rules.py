@@ -0,0 +1,194 @@
+import json
+import math
+import os
+from collections import deque
+
+from src.config import SYMBOLS, ALERT_RULES_FILE, ALERT_THRESHOLD_FIRST, ALERT_THRESHOLD_STEP
+from src.logs import log_to_file
+
+DEFAULT_RULES = [{"type": "drop", "first": ALERT_THRESHOLD_FIRST, "step": ALERT_THRESHOLD_STEP}]
+
+price_windows = {}
+
+compiled_rules = None
+compiled_mtime = None
+
+
+def measure_change(quote):
+    return quote["change_pct"]
+
+
+def measure_from_high(quote):
+    high = quote.get("day_high")
+    if not high:
+        return None
+    return (quote["price"] - high) / high * 100
+
+
+def measure_zscore(window):
+    """Measure reading the z-score against the last window prices (see update_zscores)."""
+    def measure(quote):
+        return (quote.get("zscores") or {}).get(window)
+    return measure
+
+
+def measure_intraday(key):
+    """Measure reading one of the intraday analytics (only present with QUOTE_PROFILE=full)."""
+    def measure(quote):
+        return (quote.get("intraday") or {}).get(key)
+    return measure
+
+
+INTRADAY_RULES = ("vwap_deviation", "drawdown", "velocity")
+
+
+class LadderRule:
+    """Alert each time measure(quote) reaches first, first + step, first + 2 * step, ..."""
+
+    def __init__(self, name, first, step, measure):
+        self.name = name
+        self.first = first
+        self.step = step
+        self.measure = measure
+
+    def state_key(self, symbol):
+        return symbol if self.name == "drop" else f"{symbol}:{self.name}"
+
+    def reached(self, value):
+        return value is not None and (value - self.first) * self.step >= 0
+
+    def is_new(self, level, last_sent):
+        return (level - last_sent) * self.step > 0
+
+
+class SymbolRules:
+    def __init__(self, rules, windows):
+        self.rules = rules
+        self.windows = windows
+
+
+def volatility_window(entry):
+    return max(entry.get("window", 12), 2)
+
+
+def build_rules(entry):
+    rule_type = entry["type"]
+    if rule_type == "drop":
+        return [LadderRule("drop", entry["first"], entry["step"], measure_change)]
+    if rule_type == "rise":
+        return [LadderRule("rise", entry["first"], entry["step"], measure_change)]
+    if rule_type == "drop_from_high":
+        return [LadderRule("drop_from_high", entry["first"], entry["step"], measure_from_high)]
+    if rule_type in INTRADAY_RULES:
+        return [LadderRule(rule_type, entry["first"], entry["step"], measure_intraday(rule_type))]
+    if rule_type == "volatility":
+        band = entry.get("band", 2.0)
+        measure = measure_zscore(volatility_window(entry))
+        return [
+            LadderRule("volatility_down", -band, -1.0, measure),
+            LadderRule("volatility_up", band, 1.0, measure),
+        ]
+    raise ValueError(f"Unknown alert rule type: {rule_type}")
+
+
+def rule_error(entry):
+    """Return why a rule entry cannot be compiled, or None if it is valid."""
+    try:
+        rules = build_rules(entry)
+    except (KeyError, TypeError, ValueError) as e:
+        return repr(e)
+    for rule in rules:
+        if not all(isinstance(value, (int, float)) for value in (rule.first, rule.step)) or rule.step == 0:
+            return "first and step must be numbers and step must not be 0"
+    return None
+
+
+def valid_spec(spec):
+    """Return spec without its invalid entries, logging each one.
+
+    A symbol left without valid entries falls back to the "*" default.
+    """
+    valid = {}
+    for symbol, entries in spec.items():
+        if not isinstance(entries, list):
+            log_to_file(f"Alert rules: skipping {symbol}: expected a list of rules", level="WARNING")
+            continue
+        kept = []
+        for entry in entries:
+            error = rule_error(entry)
+            if error is None:
+                kept.append(entry)
+            else:
+                log_to_file(f"Alert rules: skipping {symbol} rule {json.dumps(entry)}: {error}", level="WARNING")
+        if kept:
+            valid[symbol] = kept
+    return valid
+
+
+def compile_rules(spec, symbols):
+    """Build {symbol: SymbolRules} once, so a cycle only visits each symbol's own rules.
+
+    spec maps symbols (or "*" for every other symbol) to rule entries such as
+    {"type": "drop", "first": -2.0, "step": -1.0} or {"type": "volatility", "window": 12, "band": 2.5}.
+    vwap_deviation, drawdown and velocity ladders use the intraday analytics.
+    """
+    default = spec.get("*", DEFAULT_RULES)
+    compiled = {}
+    for symbol in set(symbols) | (set(spec) - {"*"}):
+        entries = spec.get(symbol, default)
+        rules = [rule for entry in entries for rule in build_rules(entry)]
+        windows = sorted({volatility_window(entry) for entry in entries if entry["type"] == "volatility"})
+        compiled[symbol] = SymbolRules(rules, windows)
+    return compiled
+
+
+def get_rules():
+    """Return the compiled rules, recompiling only when ALERT_RULES_FILE changes.
+
+    Invalid entries are logged and skipped; a file that cannot be parsed
+    keeps the last good rules (or the defaults), so a bad edit never stops
+    the checks.
+    """
+    global compiled_rules, compiled_mtime
+    mtime = os.path.getmtime(ALERT_RULES_FILE) if os.path.exists(ALERT_RULES_FILE) else None
+    if compiled_rules is None or mtime != compiled_mtime:
+        spec = {}
+        if mtime is not None:
+            try:
+                with open(ALERT_RULES_FILE, "r") as f:
+                    spec = json.load(f)
+                if not isinstance(spec, dict):
+                    raise ValueError("expected an object of symbol rules")
+            except ValueError as e:
+                log_to_file(f"Alert rules: ignoring {ALERT_RULES_FILE}: {e}", level="ERROR")
+                compiled_mtime = mtime
+                if compiled_rules is None:
+                    compiled_rules = compile_rules({}, SYMBOLS)
+                return compiled_rules
+        compiled_rules = compile_rules(valid_spec(spec), SYMBOLS)
+        compiled_mtime = mtime
+    return compiled_rules
+
+
+def zscore(samples, price):
+    mean = sum(samples) / len(samples)
+    std = math.sqrt(sum((p - mean) ** 2 for p in samples) / (len(samples) - 1))
+    return (price - mean) / std if std > 0 else None
+
+
+def update_zscores(symbol, price, windows):
+    """Add price to the symbol's rolling prices and return {window: z-score against the previous window prices}.
+
+    One deque per symbol keeps enough prices for the largest window; each
+    window is scored on its own last prices and is None until it has been
+    filled once.
+    """
+    size = max(windows)
+    samples = price_windows.get(symbol)
+    if samples is None or samples.maxlen != size:
+        samples = price_windows[symbol] = deque(samples or (), maxlen=size)
+
+    history = list(samples)
+    zscores = {window: zscore(history[-window:], price) if len(history) >= window else None for window in windows}
+    samples.append(price)
+    return zscores
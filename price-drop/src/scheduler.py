@@ -1,25 +1,58 @@
 import atexit
 from datetime import datetime
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from src.config import CHECK_INTERVAL
+from src.config import POLL_MIN_INTERVAL, SYMBOLS
 from src.price_checker import check_prices
+from src.logs import log_to_file
+from src.market_calendar import EXCHANGES, DEFAULT_EXCHANGE, group_by_exchange
+from src.leader import is_leader, release_leadership
+from src.notifier import ensure_sender
+from src.metrics import Histogram
 
 scheduler = BackgroundScheduler()
 
+scheduler_lag = Histogram("price_drop_scheduler_lag_seconds", "Delay between a job's scheduled and actual start, by job")
+
+
+def record_lag(event):
+    now = datetime.now(event.scheduled_run_times[-1].tzinfo)
+    scheduler_lag.observe(max((now - event.scheduled_run_times[-1]).total_seconds(), 0), job=event.job_id)
+
+
+def job_id(exchange_name):
+    return f"price_check_{exchange_name}"
+
+
+def run_scheduled_check(exchange_name, symbols):
+    exchange = EXCHANGES.get(exchange_name, DEFAULT_EXCHANGE)
+    now = datetime.now(exchange.timezone)
+    if not exchange.is_open(now):
+        opens_at = exchange.next_open(now)
+        scheduler.modify_job(job_id(exchange_name), next_run_time=opens_at)
+        log_to_file(f"{exchange_name} closed, next check at session open {opens_at.isoformat()}")
+        return
+    if is_leader():
+        ensure_sender()
+        check_prices(symbols)
+
 
 def start_scheduler():
-    scheduler.add_job(
-        func=check_prices,
-        trigger="interval",
-        seconds=CHECK_INTERVAL,
-        id='price_check_job',
-        name='Price Check Job',
-        replace_existing=True,
-        next_run_time=datetime.now()
-    )
-    
-    print(f"Starting scheduler with interval {CHECK_INTERVAL}s")
+    for exchange_name, symbols in group_by_exchange(SYMBOLS).items():
+        scheduler.add_job(
+            func=run_scheduled_check,
+            trigger="interval",
+            seconds=POLL_MIN_INTERVAL,
+            args=[exchange_name, symbols],
+            id=job_id(exchange_name),
+            name=f'Price Check Job ({exchange_name})',
+            replace_existing=True,
+            next_run_time=datetime.now()
+        )
+
+    scheduler.add_listener(record_lag, EVENT_JOB_SUBMITTED)
+    print(f"Starting scheduler with a {POLL_MIN_INTERVAL}s tick")
     scheduler.start()
     atexit.register(shutdown_scheduler)
 
@@ -30,3 +63,4 @@ def shutdown_scheduler():
             scheduler.shutdown()
     except Exception:
         pass
+    release_leadership()
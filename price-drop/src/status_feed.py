@@ -0,0 +1,69 @@
+import threading
+import time
+
+from src import status_store
+from src.config import STATUS_POLL_SECONDS
+
+condition = threading.Condition()
+latest = (0, None, None)
+previous = (0, None, None)
+latest_diff = None
+watcher_thread = None
+
+
+def diff_status(old, new):
+    """Return the per-symbol changes between two status snapshots."""
+    old_results = {r["symbol"]: r for r in (old or {}).get("results", [])}
+    new_results = {r["symbol"]: r for r in (new or {}).get("results", [])}
+    return {
+        "timestamp": new.get("timestamp"),
+        "success": new.get("success"),
+        "error": new.get("error"),
+        "changed": [r for symbol, r in new_results.items() if old_results.get(symbol) != r],
+        "removed": [symbol for symbol in old_results if symbol not in new_results]
+    }
+
+
+def refresh():
+    """Load the shared status once for this process and wake every waiting stream if it changed."""
+    global latest, previous, latest_diff
+    snapshot = status_store.load()
+    if snapshot[0] == latest[0]:
+        return False
+    with condition:
+        previous, latest = latest, snapshot
+        latest_diff = diff_status(previous[1], latest[1]) if snapshot[1] is not None else None
+        condition.notify_all()
+    return True
+
+
+def watch():
+    while True:
+        try:
+            refresh()
+        except Exception:
+            pass
+        time.sleep(STATUS_POLL_SECONDS)
+
+
+def ensure_watcher():
+    global watcher_thread
+    with condition:
+        if watcher_thread is None or not watcher_thread.is_alive():
+            watcher_thread = threading.Thread(target=watch, name="status-watcher", daemon=True)
+            watcher_thread.start()
+
+
+def wait_for_update(version, timeout):
+    """Block until a snapshot newer than version is published or timeout passes.
+
+    Returns (snapshot, diff); diff is None when the client missed more than
+    one version and needs the full snapshot.
+    """
+    ensure_watcher()
+    with condition:
+        condition.wait_for(lambda: latest[0] != version, timeout)
+        if latest[0] == version:
+            return None, None
+        diff = latest_diff if previous[0] == version else None
+        return latest, diff
@@ -0,0 +1,52 @@
+import json
+import threading
+
+from src.config import STATUS_DB
+from src.db import get_connection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS check_status (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+"""
+
+snapshots = {}
+snapshots_lock = threading.Lock()
+
+
+def publish(status):
+    """Atomically replace the shared check status and return its new version."""
+    body = json.dumps(status)
+    row = get_connection(STATUS_DB, SCHEMA).execute(
+        "INSERT INTO check_status (id, version, body) VALUES (1, 1, ?) "
+        "ON CONFLICT(id) DO UPDATE SET version = version + 1, body = excluded.body "
+        "RETURNING version",
+        (body,)
+    ).fetchone()
+    return row[0]
+
+
+def load():
+    """Return (version, status, body) of the latest published check.
+
+    Only the version is read when it matches the snapshot this process
+    already holds, so unchanged status is neither re-read nor re-parsed.
+    Returns (0, None, None) when nothing has been published yet.
+    """
+    conn = get_connection(STATUS_DB, SCHEMA)
+    row = conn.execute("SELECT version FROM check_status WHERE id = 1").fetchone()
+    if row is None:
+        return 0, None, None
+
+    with snapshots_lock:
+        cached = snapshots.get(STATUS_DB)
+    if cached is not None and cached[0] == row[0]:
+        return cached
+
+    row = conn.execute("SELECT version, body FROM check_status WHERE id = 1").fetchone()
+    snapshot = (row[0], json.loads(row[1]), row[1])
+    with snapshots_lock:
+        snapshots[STATUS_DB] = snapshot
+    return snapshot
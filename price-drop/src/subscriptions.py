@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+
+from src.config import SYMBOLS, SUBSCRIPTIONS_FILE
+from src.rules import DEFAULT_RULES, compile_rules, rule_error
+from src.alert_engine import evaluate_alerts
+from src.logs import log_to_file
+
+registry = None
+registry_mtime = None
+
+
+class PrefixedState:
+    """Read-only view of the shared alert state under one group's key prefix."""
+
+    def __init__(self, state, prefix):
+        self.state = state
+        self.prefix = prefix
+
+    def get(self, key, default=None):
+        return self.state.get(self.prefix + key, default)
+
+
+class Group:
+    """Subscribers that share one rule set; its alerts are evaluated once and sent to every chat."""
+
+    def __init__(self, rules_spec, symbols):
+        signature = json.dumps(rules_spec, sort_keys=True)
+        self.group_id = hashlib.sha1(signature.encode()).hexdigest()[:10]
+        self.prefix = f"sub:{self.group_id}:"
+        self.rules = compile_rules({"*": rules_spec}, symbols)
+
+
+def entry_error(entry):
+    """Return why a subscriptions.json entry cannot be used, or None if it is valid."""
+    if not isinstance(entry, dict) or entry.get("chat_id") in (None, ""):
+        return "missing chat_id"
+    if not isinstance(entry.get("symbols") or [], list):
+        return "symbols must be a list"
+    rules_spec = entry.get("rules") or DEFAULT_RULES
+    if not isinstance(rules_spec, list):
+        return "rules must be a list"
+    for rule in rules_spec:
+        error = rule_error(rule)
+        if error is not None:
+            return f"invalid rule: {error}"
+    return None
+
+
+class Registry:
+    """Subscriptions indexed by symbol: {symbol: [(group, [chat_id, ...]), ...]}.
+
+    entries are {"chat_id": ..., "symbols": [...] or ["*"], "rules": [...]};
+    rules default to the global drop ladder. Invalid entries are logged and
+    skipped, so one bad entry never stops the others from being served.
+    """
+
+    def __init__(self, entries, symbols):
+        valid = []
+        for entry in entries:
+            error = entry_error(entry)
+            if error is None:
+                valid.append(entry)
+            else:
+                log_to_file(f"Subscriptions: skipping entry {json.dumps(entry)}: {error}", level="WARNING")
+        entries = valid
+
+        specs = {}
+        watchlists = {}
+        for entry in entries:
+            rules_spec = entry.get("rules") or DEFAULT_RULES
+            signature = json.dumps(rules_spec, sort_keys=True)
+            specs[signature] = rules_spec
+            watched = entry.get("symbols") or ["*"]
+            for symbol in (symbols if "*" in watched else watched):
+                chats = watchlists.setdefault(signature, {}).setdefault(symbol, [])
+                if str(entry["chat_id"]) not in chats:
+                    chats.append(str(entry["chat_id"]))
+
+        self.index = {}
+        self.subscribers = len({str(entry["chat_id"]) for entry in entries})
+        self.groups = []
+        for signature, watchlist in watchlists.items():
+            group = Group(specs[signature], list(watchlist))
+            self.groups.append(group)
+            for symbol, chats in watchlist.items():
+                self.index.setdefault(symbol, []).append((group, chats))
+
+    def windows(self):
+        """Every volatility window any group uses, per symbol."""
+        return {
+            symbol: sorted({window for group, _ in entries for window in group.rules[symbol].windows})
+            for symbol, entries in self.index.items()
+        }
+
+    def evaluate(self, quotes, last_sent):
+        """Return [(alert, chat_ids)]: each group's crossings, computed once and fanned out to its chats.
+
+        Alert keys carry the group prefix so groups keep separate state.
+        """
+        fanned = []
+        for quote in quotes:
+            for group, chats in self.index.get(quote["symbol"], ()):
+                symbol_rules = {quote["symbol"]: group.rules[quote["symbol"]]}
+                for alert in evaluate_alerts([quote], symbol_rules, PrefixedState(last_sent, group.prefix)):
+                    alert["key"] = group.prefix + alert["key"]
+                    fanned.append((alert, chats))
+        return fanned
+
+
+def get_subscriptions():
+    """Return the subscription registry, rebuilding it only when SUBSCRIPTIONS_FILE changes."""
+    global registry, registry_mtime
+    mtime = os.path.getmtime(SUBSCRIPTIONS_FILE) if os.path.exists(SUBSCRIPTIONS_FILE) else None
+    if registry is None or mtime != registry_mtime:
+        entries = []
+        if mtime is not None:
+            try:
+                with open(SUBSCRIPTIONS_FILE, "r") as f:
+                    entries = json.load(f)
+                if not isinstance(entries, list):
+                    raise ValueError("expected a list of subscriptions")
+            except ValueError as e:
+                log_to_file(f"Subscriptions: ignoring {SUBSCRIPTIONS_FILE}: {e}", level="ERROR")
+                entries = []
+        registry = Registry(entries, SYMBOLS)
+        registry_mtime = mtime
+    return registry
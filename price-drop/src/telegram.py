@@ -1,12 +1,37 @@
-import requests
-from src.config import TELEGRAM_CHAT_ID, TELEGRAM_TOKEN
+from src import http_client
+from src.config import TELEGRAM_CHAT_ID, TELEGRAM_TOKEN, TELEGRAM_API_URL
 from src.logs import log_to_file
+from src.metrics import Counter, Histogram
+
+send_duration = Histogram("price_drop_telegram_send_duration_seconds", "Telegram sendMessage latency")
+sends_total = Counter("price_drop_telegram_sends_total", "Telegram sendMessage calls by result (ok, rate_limited, error)")
+
+
+class TelegramError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def deliver(message, chat_id=TELEGRAM_CHAT_ID):
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}/sendMessage"
+    try:
+        with send_duration.time():
+            response = http_client.post(url, data={"chat_id": chat_id, "text": message})
+    except Exception:
+        sends_total.inc(result="error")
+        raise
+    if response.status_code == 429:
+        retry_after = response.json().get("parameters", {}).get("retry_after")
+        sends_total.inc(result="rate_limited")
+        raise TelegramError("Rate limited by Telegram", retry_after)
+    sends_total.inc(result="ok" if response.ok else "error")
+    response.raise_for_status()
 
 
 def send_telegram(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
     try:
-        requests.post(url, data={"chat_id": TELEGRAM_CHAT_ID, "text": message})
+        deliver(message)
         log_to_file("Telegram: Notification sent successfully")
     except Exception as e:
-        log_to_file(f"Telegram: Error sending message: {e}")
\ No newline at end of file
+        log_to_file(f"Telegram: Error sending message: {e}", level="ERROR")
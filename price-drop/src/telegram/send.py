@@ -1,4 +1,4 @@
-import requests
+from src import http_client
 from src.config import TELEGRAM_CHAT_ID, TELEGRAM_TOKEN
 from src.file.logs import log_to_file
 
@@ -6,7 +6,8 @@ from src.file.logs import log_to_file
 def send_telegram(message):
     url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
     try:
-        requests.post(url, data={"chat_id": TELEGRAM_CHAT_ID, "text": message})
+        response = http_client.post(url, data={"chat_id": TELEGRAM_CHAT_ID, "text": message})
+        response.raise_for_status()
         log_to_file("Telegram: Notification sent successfully")
     except Exception as e:
-        log_to_file(f"Telegram: Error sending message: {e}")
\ No newline at end of file
+        log_to_file(f"Telegram: Error sending message: {e}", level="ERROR")
\ No newline at end of file
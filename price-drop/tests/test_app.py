@@ -2,8 +2,10 @@ import pytest
 import json
 import os
 import sys
+import time
 from unittest.mock import patch, MagicMock
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -12,13 +14,35 @@ os.environ['TELEGRAM_TOKEN'] = 'test_token'
 os.environ['CHECK_INTERVAL'] = '300'
 
 
-with patch('apscheduler.schedulers.background.BackgroundScheduler.start'), \
-     patch('apscheduler.schedulers.background.BackgroundScheduler.add_job'), \
-     patch('apscheduler.schedulers.background.BackgroundScheduler.shutdown'):
-    from app import app
-    from src.config import SYMBOL_NAMES, SYMBOLS, ALERT_THRESHOLD_FIRST, ALERT_THRESHOLD_STEP
-    from src.price_checker import get_next_threshold, check_prices
-    import src.price_checker as price_checker_module
+from app import create_app
+from src.config import SYMBOL_NAMES, SYMBOLS, ALERT_THRESHOLD_FIRST, ALERT_THRESHOLD_STEP
+from src.price_checker import get_next_threshold, check_prices
+import src.price_checker as price_checker_module
+from src import status_store
+from src.quote_cache import QuoteCache
+
+app = create_app(warm_up=False)
+
+
+@pytest.fixture(autouse=True)
+def status_db(tmp_path):
+    with patch('src.status_store.STATUS_DB', str(tmp_path / "status.db")), \
+         patch('src.history.HISTORY_DB', str(tmp_path / "history.db")), \
+         patch('src.notifier.NOTIFY_DB', str(tmp_path / "notifications.db")), \
+         patch('src.check_jobs.JOBS_DB', str(tmp_path / "jobs.db")), \
+         patch('src.notifier.ensure_sender'), \
+         patch.dict('src.change_tracker.states', clear=True), \
+         patch.dict('src.poll_planner.samples', clear=True), \
+         patch.dict('src.circuit_breaker.breakers', clear=True), \
+         patch('src.metrics.METRICS_DIR', str(tmp_path / "metrics")), \
+         patch.dict('src.metrics.values', clear=True), \
+         patch('src.subscriptions.SUBSCRIPTIONS_FILE', str(tmp_path / "subscriptions.json")), \
+         patch('src.subscriptions.registry', None), \
+         patch('src.price_checker.quote_cache', QuoteCache()), \
+         patch('src.price_checker.last_housekeeping', None), \
+         patch('src.status_feed.latest', (0, None, None)), \
+         patch('src.status_feed.previous', (0, None, None)):
+        yield
 
 
 @pytest.fixture
@@ -39,6 +63,12 @@ class TestHealthEndpoint:
         assert data['service'] == 'price-drop-tracker'
 
 
+    def test_health_does_not_read_status_store(self, client):
+        with patch('src.status_store.load', side_effect=RuntimeError('database is locked')):
+            response = client.get('/health')
+        assert response.status_code == 200
+
+
 class TestIndexEndpoint:
     def test_index_returns_200(self, client):
         response = client.get('/')
@@ -51,18 +81,17 @@ class TestIndexEndpoint:
 
 class TestStatusEndpoint:
     def test_status_no_checks(self, client):
-        price_checker_module.last_check_status = None
         response = client.get('/status')
         assert response.status_code == 200
         data = json.loads(response.data)
         assert data['status'] == 'no_checks_yet'
 
     def test_status_with_data(self, client):
-        price_checker_module.last_check_status = {
+        status_store.publish({
             'timestamp': '2026-02-07T12:00:00',
             'results': [{'symbol': 'ISAC.L', 'status': 'checked'}],
             'success': True
-        }
+        })
         response = client.get('/status')
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -81,17 +110,113 @@ class TestSymbolsEndpoint:
         assert 'ETFBW20TR.WA' in data['symbols']
 
 
+def run_queued_job():
+    from src import check_jobs
+    with patch('src.check_jobs.is_leader', return_value=True):
+        return check_jobs.run_next()
+
+
 class TestCheckPricesEndpoint:
-    @patch('src.routes.check_prices')
+    @patch('src.check_jobs.check_prices', return_value=None)
     def test_check_prices_endpoint(self, mock_check, client):
         response = client.post('/check-prices')
-        assert response.status_code == 200
+        assert run_queued_job()
+        assert response.status_code == 202
+        data = json.loads(response.data)
+        assert data['merged'] is False
+        assert response.headers['Location'] == f"/check-prices/{data['job_id']}"
+        mock_check.assert_called_once_with(manual=True, force=False)
+
+        job = json.loads(client.get(f"/check-prices/{data['job_id']}").data)
+        assert job['status'] == 'done'
+        assert 'last_check' in job
+
+    @patch('src.check_jobs.check_prices')
+    def test_request_returns_before_check_runs(self, mock_check, client):
+        data = json.loads(client.post('/check-prices').data)
+        mock_check.assert_not_called()
+        job = json.loads(client.get(f"/check-prices/{data['job_id']}").data)
+        assert job['status'] == 'queued'
+
+    def test_merges_with_job_in_flight(self, client):
+        first = json.loads(client.post('/check-prices').data)
+        second = json.loads(client.post('/check-prices').data)
+        forced = json.loads(client.post('/check-prices?force=1').data)
+        forced_again = json.loads(client.post('/check-prices').data)
+        assert second == dict(first, merged=True, message='Price check already in progress')
+        assert forced['merged'] is False
+        assert forced_again['job_id'] == forced['job_id']
+
+    def test_stale_job_not_merged(self, client):
+        first = json.loads(client.post('/check-prices').data)
+        with patch('src.check_jobs.time.time', return_value=time.time() + 1000):
+            second = json.loads(client.post('/check-prices').data)
+            job = json.loads(client.get(f"/check-prices/{first['job_id']}").data)
+        assert second['job_id'] != first['job_id']
+        assert job['status'] == 'expired'
+
+    @patch('src.check_jobs.check_prices', side_effect=RuntimeError('boom'))
+    def test_failed_job(self, mock_check, client):
+        data = json.loads(client.post('/check-prices').data)
+        run_queued_job()
+        job = json.loads(client.get(f"/check-prices/{data['job_id']}").data)
+        assert job['status'] == 'failed'
+        assert job['error'] == 'boom'
+
+    def test_job_failed_when_cycle_fails(self, client):
+        with patch('src.price_checker.get_provider', side_effect=RuntimeError('provider down')), \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            data = json.loads(client.post('/check-prices').data)
+            run_queued_job()
+        job = json.loads(client.get(f"/check-prices/{data['job_id']}").data)
+        assert job['status'] == 'failed'
+        assert job['error'] == 'provider down'
+        assert price_checker_module.get_last_check_status()['success'] is False
+
+    def test_unknown_job(self, client):
+        assert client.get('/check-prices/nope').status_code == 404
+
+    @patch('src.check_jobs.check_prices', return_value=None)
+    def test_only_leader_runs_jobs(self, mock_check, client):
+        from src import check_jobs
+        data = json.loads(client.post('/check-prices').data)
+        with patch('src.check_jobs.is_leader', return_value=False):
+            assert not check_jobs.run_next()
+        assert json.loads(client.get(f"/check-prices/{data['job_id']}").data)['status'] == 'queued'
+        assert run_queued_job()
+        assert not run_queued_job()
         mock_check.assert_called_once()
 
+    def test_manual_job_waits_for_running_cycle(self, client):
+        import threading
+        order = []
+        entered = threading.Event()
+        release = threading.Event()
+
+        def scheduled_cycle(symbols, manual, force):
+            order.append(('start', manual))
+            if not manual:
+                entered.set()
+                release.wait(5)
+            order.append(('end', manual))
+
+        with patch('src.price_checker.run_cycle', side_effect=scheduled_cycle):
+            scheduled = threading.Thread(target=check_prices)
+            scheduled.start()
+            entered.wait(5)
+            client.post('/check-prices')
+            manual = threading.Thread(target=run_queued_job)
+            manual.start()
+            time.sleep(0.1)
+            release.set()
+            scheduled.join(5)
+            manual.join(5)
+        assert order == [('start', False), ('end', False), ('start', True), ('end', True)]
+
 
 class TestSendStatusTelegramEndpoint:
     def test_no_data_yet(self, client):
-        price_checker_module.last_check_status = None
         response = client.post('/send-status-telegram')
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -99,13 +224,13 @@ class TestSendStatusTelegramEndpoint:
 
     @patch('src.routes.send_telegram')
     def test_sends_status(self, mock_telegram, client):
-        price_checker_module.last_check_status = {
+        status_store.publish({
             'timestamp': '2026-02-07T12:00:00',
             'results': [
                 {'symbol': 'ISAC.L', 'name': 'MSCI ACWI Globalny', 'price': 111.75, 'change_pct': 0.05, 'status': 'checked', 'alert_sent': False}
             ],
             'success': True
-        }
+        })
         response = client.post('/send-status-telegram')
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -216,8 +341,9 @@ class TestLogs:
         log_dir = str(tmp_path)
         with patch('src.config.LOG_DIR', log_dir), \
              patch('src.logs.LOG_DIR', log_dir):
-            from src.logs import log_to_file
+            from src.logs import log_to_file, flush_logs
             log_to_file("test message")
+            assert flush_logs()
             today = datetime.now().strftime('%Y-%m-%d')
             log_path = os.path.join(log_dir, f"{today}.log")
             assert os.path.exists(log_path)
@@ -235,3 +361,1533 @@ class TestLogs:
             from src.logs import cleanup_old_logs
             cleanup_old_logs()
             assert not os.path.exists(old_log)
+
+
+class TestFetcher:
+    def test_results_keep_input_order(self):
+        import time
+        from src.fetcher import fetch_all
+
+        def slow_echo(item):
+            time.sleep(0.05 * (3 - item))
+            return item * 10
+
+        results = fetch_all([0, 1, 2], slow_echo, 'example.com')
+        assert results == [(0, 0, None), (1, 10, None), (2, 20, None)]
+
+    def test_errors_are_returned_per_item(self):
+        from src.fetcher import fetch_all
+
+        def fail_on_one(item):
+            if item == 1:
+                raise ValueError("boom")
+            return item
+
+        results = fetch_all([0, 1], fail_on_one, 'example.com')
+        assert results[0] == (0, 0, None)
+        assert isinstance(results[1][2], ValueError)
+
+    def test_deadline_marks_slow_items(self):
+        import time
+        from src.fetcher import fetch_all, FetchTimeout
+
+        def slow(item):
+            time.sleep(item)
+            return item
+
+        results = fetch_all([0, 0.5], slow, 'example.com', deadline=0.1)
+        assert results[0] == (0, 0, None)
+        assert isinstance(results[1][2], FetchTimeout)
+
+    def test_host_concurrency_cap(self):
+        import threading
+        import time
+        from src.fetcher import fetch_all
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def track(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(item)
+            return item
+
+        with patch('src.fetcher.FETCH_HOST_CONCURRENCY', 2), \
+             patch.dict('src.fetcher.host_limits', clear=True):
+            fetch_all(range(8), track, 'capped.example.com')
+        assert max(peak) <= 2
+
+
+class TestCheckPricesCycle:
+    @patch('src.price_checker.cleanup_old_logs')
+    @patch('src.price_checker.cleanup_alert_file')
+    @patch('src.price_checker.get_alert_thresholds', return_value={})
+    @patch('src.price_checker.log_to_file')
+    def test_results_in_symbol_order_with_errors(self, mock_log, mock_thresholds, mock_cleanup, mock_logs_cleanup):
+        def fake_quote(symbol):
+            if symbol == 'CSPX.L':
+                raise ValueError("no data")
+            return {'regularMarketPrice': 101.0, 'previousClose': 100.0}
+
+        from src.quotes import ChartQuoteProvider
+        with patch('src.price_checker.get_provider', return_value=ChartQuoteProvider()), \
+             patch('src.quotes.ChartQuoteProvider.fetch_one', side_effect=fake_quote), \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            check_prices()
+
+        results = price_checker_module.get_last_check_status()['results']
+        assert [r['symbol'] for r in results] == SYMBOLS
+        errors = [r for r in results if r['status'] == 'error']
+        assert [r['symbol'] for r in errors] == ['CSPX.L']
+
+        from src.history import query_history
+        observed_at = int(datetime(2026, 2, 9, 12, 0, 0).timestamp())
+        assert query_history('ISAC.L', observed_at, observed_at)[0]['price'] == 101.0
+        assert query_history('CSPX.L', observed_at, observed_at) == []
+
+    @patch('src.price_checker.cleanup_old_logs')
+    @patch('src.price_checker.cleanup_alert_file')
+    @patch('src.price_checker.get_alert_thresholds', return_value={'CNDX.L': -1.5})
+    @patch('src.price_checker.flush_alert_thresholds')
+    @patch('src.price_checker.record_alert_threshold')
+    @patch('src.price_checker.queue_chat_alerts')
+    @patch('src.price_checker.log_to_file')
+    def test_alerts_sent_for_new_thresholds(self, mock_log, mock_queue, mock_save, mock_flush,
+                                            mock_thresholds, mock_cleanup, mock_logs_cleanup):
+        prices = {'ISAC.L': 98.7, 'CNDX.L': 98.2}
+
+        def fake_quote(symbol):
+            return {'regularMarketPrice': prices.get(symbol, 100.0), 'previousClose': 100.0}
+
+        from src.quotes import ChartQuoteProvider
+        with patch('src.price_checker.get_provider', return_value=ChartQuoteProvider()), \
+             patch('src.quotes.ChartQuoteProvider.fetch_one', side_effect=fake_quote), \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            check_prices()
+
+        mock_queue.assert_called_once()
+        assert len(mock_queue.call_args.args[0][price_checker_module.TELEGRAM_CHAT_ID]) == 1
+        mock_save.assert_called_once_with('ISAC.L', -1.0)
+        mock_flush.assert_called_once()
+        results = {r['symbol']: r for r in price_checker_module.get_last_check_status()['results']}
+        assert results['ISAC.L']['alert_sent'] is True
+        assert results['CNDX.L']['alert_sent'] is False
+
+
+class TestHttpClient:
+    def test_session_reused_per_host(self):
+        from src import http_client
+        with patch.dict('src.http_client.sessions', clear=True):
+            first = http_client.get_session('api.telegram.org')
+            second = http_client.get_session('api.telegram.org')
+            other = http_client.get_session('query1.finance.yahoo.com')
+        assert first is second
+        assert first is not other
+
+    @patch('src.http_client.time.sleep')
+    def test_retries_retryable_status(self, mock_sleep):
+        from src import http_client
+        session = MagicMock()
+        session.request.side_effect = [MagicMock(status_code=503), MagicMock(status_code=200)]
+        with patch('src.http_client.get_session', return_value=session):
+            response = http_client.get('https://example.com/x', retries=2)
+        assert response.status_code == 200
+        assert session.request.call_count == 2
+        mock_sleep.assert_called_once()
+
+    @patch('src.http_client.time.sleep')
+    def test_post_retryable_status_sent_once(self, mock_sleep):
+        from src import http_client
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=502)
+        with patch('src.http_client.get_session', return_value=session):
+            response = http_client.post('https://example.com/send', retries=2)
+        assert response.status_code == 502
+        assert session.request.call_count == 1
+        mock_sleep.assert_not_called()
+
+    @patch('src.http_client.time.sleep')
+    def test_post_read_timeout_not_retried(self, mock_sleep):
+        import requests
+        from src import http_client
+        session = MagicMock()
+        session.request.side_effect = requests.ReadTimeout()
+        with patch('src.http_client.get_session', return_value=session):
+            with pytest.raises(requests.ReadTimeout):
+                http_client.post('https://example.com/x', retries=2)
+        assert session.request.call_count == 1
+
+    def test_default_timeouts_applied(self):
+        from src import http_client
+        from src.config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200)
+        with patch('src.http_client.get_session', return_value=session):
+            http_client.get('https://example.com/x')
+        assert session.request.call_args.kwargs['timeout'] == (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+class TestQuoteProviders:
+    def test_batch_splits_results_per_symbol(self):
+        from src.quotes import BatchQuoteProvider
+        reply = MagicMock(status_code=200)
+        reply.json.return_value = {'quoteResponse': {'result': [
+            {'symbol': 'A.L', 'regularMarketPrice': 10.0, 'regularMarketPreviousClose': 11.0},
+            {'symbol': 'B.L', 'regularMarketPrice': 20.0, 'regularMarketPreviousClose': 19.0},
+        ]}}
+        fallback = MagicMock()
+        fallback.fetch.return_value = []
+        with patch('src.quotes.http_client.get', return_value=reply) as mock_get:
+            results = BatchQuoteProvider(fallback=fallback).fetch(['B.L', 'A.L'])
+        mock_get.assert_called_once()
+        assert [symbol for symbol, _, _ in results] == ['B.L', 'A.L']
+        assert results[1][1]['previousClose'] == 11.0
+        fallback.fetch.assert_called_once_with([])
+
+    def test_batch_falls_back_for_missing_symbols(self):
+        from src.quotes import BatchQuoteProvider
+        reply = MagicMock(status_code=200)
+        reply.json.return_value = {'quoteResponse': {'result': [
+            {'symbol': 'A.L', 'regularMarketPrice': 10.0, 'regularMarketPreviousClose': 11.0},
+        ]}}
+        fallback = MagicMock()
+        fallback.fetch.return_value = [('C.WA', {'regularMarketPrice': 5.0, 'previousClose': 5.0}, None)]
+        with patch('src.quotes.http_client.get', return_value=reply):
+            results = BatchQuoteProvider(fallback=fallback).fetch(['A.L', 'C.WA'])
+        fallback.fetch.assert_called_once_with(['C.WA'])
+        assert results[1] == ('C.WA', {'regularMarketPrice': 5.0, 'previousClose': 5.0}, None)
+
+    def test_batch_failure_falls_back_for_whole_chunk(self):
+        from src.quotes import BatchQuoteProvider
+        fallback = MagicMock()
+        fallback.fetch.return_value = [('A.L', None, ValueError("down")), ('B.L', {'regularMarketPrice': 1}, None)]
+        with patch('src.quotes.http_client.get', side_effect=ConnectionError("unauthorized")):
+            results = BatchQuoteProvider(batch_size=1, fallback=fallback).fetch(['A.L', 'B.L'])
+        fallback.fetch.assert_called_once_with(['A.L', 'B.L'])
+        assert isinstance(results[0][2], ValueError)
+        assert results[1][1] == {'regularMarketPrice': 1}
+
+
+class TestReadMeta:
+    BODY = (
+        '{"chart":{"result":[{"meta":{"symbol":"ISAC.L","regularMarketPrice":111.75,'
+        '"previousClose":111.2,"longName":"iShares Ó ACWI"},"timestamp":[1,2,3]}],"error":null}}'
+    )
+
+    def chunks(self, body, size):
+        data = body.encode('utf-8')
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_reads_meta_across_chunk_boundaries(self):
+        from src.quotes import read_meta
+        for size in (1, 3, 7, 64, 4096):
+            meta = read_meta(self.chunks(self.BODY, size))
+            assert meta['regularMarketPrice'] == 111.75
+            assert meta['longName'] == 'iShares Ó ACWI'
+
+    def test_stops_decoding_after_meta(self):
+        from src.quotes import read_meta
+        chunks = self.chunks(self.BODY.split('"timestamp"')[0], 16) + [b'<not json at all>']
+        assert read_meta(chunks)['previousClose'] == 111.2
+
+    def test_error_response_raises(self):
+        from src.quotes import read_meta
+        body = '{"chart":{"result":null,"error":{"code":"Not Found","description":"No data found"}}}'
+        with pytest.raises(ValueError):
+            read_meta(self.chunks(body, 8))
+
+    def test_profile_selects_query(self):
+        from src.quotes import ChartQuoteProvider
+        reply = MagicMock()
+        reply.json.return_value = json.loads(self.BODY)
+        with patch('src.quotes.http_client.get', return_value=reply) as mock_get:
+            meta = ChartQuoteProvider(profile='full').fetch_one('ISAC.L')
+        assert 'interval=1m&range=1d' in mock_get.call_args.args[0]
+        assert meta['symbol'] == 'ISAC.L'
+
+
+class TestLeaderElection:
+    @pytest.fixture(autouse=True)
+    def lock_path(self, tmp_path):
+        path = str(tmp_path / "scheduler.lock")
+        with patch('src.leader.LEADER_LOCK_FILE', path):
+            yield path
+        from src.leader import release_leadership
+        release_leadership()
+
+    def test_first_caller_becomes_leader(self, lock_path):
+        from src.leader import is_leader
+        assert is_leader() is True
+        assert is_leader() is True
+        with open(lock_path) as f:
+            assert f.read() == str(os.getpid())
+
+    def test_lock_held_elsewhere_blocks_leadership(self, lock_path):
+        import fcntl
+        from src.leader import is_leader
+        with open(lock_path, 'a+') as other:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            assert is_leader() is False
+            fcntl.flock(other, fcntl.LOCK_UN)
+        assert is_leader() is True
+
+    def test_followers_skip_scheduled_check(self):
+        from src import scheduler
+        with patch('src.scheduler.is_leader', return_value=False), \
+             patch('src.scheduler.check_prices') as mock_check, \
+             patch('src.market_calendar.Exchange.is_open', return_value=True):
+            scheduler.run_scheduled_check('GPW', ['PKN.WA'])
+        mock_check.assert_not_called()
+
+
+class TestStatusStore:
+    def test_empty_store(self):
+        assert status_store.load() == (0, None, None)
+
+    def test_publish_increments_version(self):
+        assert status_store.publish({'success': True}) == 1
+        assert status_store.publish({'success': False}) == 2
+        version, status, _ = status_store.load()
+        assert version == 2
+        assert status == {'success': False}
+
+    def test_unchanged_snapshot_is_reused(self):
+        status_store.publish({'success': True})
+        first = status_store.load()
+        assert status_store.load() is first
+
+    def test_visible_from_another_connection(self):
+        import threading
+        status_store.publish({'success': True, 'results': []})
+        seen = []
+        db_path = status_store.STATUS_DB
+
+        def read_in_thread():
+            with patch('src.status_store.STATUS_DB', db_path):
+                seen.append(status_store.load()[1])
+
+        thread = threading.Thread(target=read_in_thread)
+        thread.start()
+        thread.join()
+        assert seen == [{'success': True, 'results': []}]
+
+
+class TestPriceHistory:
+    def test_range_query(self):
+        from src.history import record_prices, query_history
+        record_prices([('ISAC.L', ts, 100.0 + ts, -0.1) for ts in range(0, 3000, 300)])
+        record_prices([('CSPX.L', 600, 5.0, 0.0)])
+        points = query_history('ISAC.L', 600, 1200)
+        assert [p['timestamp'] for p in points] == [600, 900, 1200]
+        assert points[0]['price'] == 700.0
+
+    def test_history_endpoint(self, client):
+        from src.history import record_prices
+        record_prices([('ISAC.L', 1000, 111.0, -0.5), ('ISAC.L', 2000, 112.0, 0.4)])
+        response = client.get('/history/ISAC.L?from=0&to=1500')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 1
+        assert data['points'][0]['price'] == 111.0
+
+    def test_history_endpoint_rejects_bad_time(self, client):
+        response = client.get('/history/ISAC.L?from=yesterday')
+        assert response.status_code == 400
+
+    def test_compaction_downsamples_and_expires(self):
+        from datetime import timedelta
+        from src import history
+        now = datetime(2026, 6, 1, 12, 0, 0)
+        old = int((now - timedelta(days=60)).timestamp())
+        old -= old % 3600
+        expired = int((now - timedelta(days=400)).timestamp())
+        recent = int((now - timedelta(days=1)).timestamp())
+        history.record_prices(
+            [('ISAC.L', old + i * 300, 100.0 + i, -1.0) for i in range(4)]
+            + [('ISAC.L', expired, 90.0, 0.0), ('ISAC.L', recent, 120.0, 0.0), ('ISAC.L', recent + 300, 121.0, 0.0)]
+        )
+        with patch('src.history.last_compaction_date', None):
+            assert history.compact_history(now) is True
+            assert history.compact_history(now) is False
+        points = history.query_history('ISAC.L', 0, int(now.timestamp()))
+        assert [(p['timestamp'], p['price']) for p in points] == [
+            (old, 101.5), (recent, 120.0), (recent + 300, 121.0)
+        ]
+
+
+class TestAlertEngine:
+    def test_closed_form_matches_ladder_walk(self):
+        from src.alert_engine import ladder_threshold
+
+        def walk(change_pct):
+            threshold = ALERT_THRESHOLD_FIRST
+            while threshold >= change_pct:
+                threshold += ALERT_THRESHOLD_STEP
+            return threshold - ALERT_THRESHOLD_STEP
+
+        for hundredths in range(-1200, 1):
+            change_pct = hundredths / 100
+            assert ladder_threshold(change_pct) == walk(change_pct), change_pct
+
+    def test_evaluates_whole_cycle(self):
+        from src.alert_engine import evaluate_alerts
+        from src.rules import compile_rules
+        quotes = [
+            {'symbol': s, 'price': 100.0 + c, 'change_pct': c}
+            for s, c in [('A', 0.4), ('B', -1.2), ('C', -2.6), ('D', -1.6)]
+        ]
+        alerts = evaluate_alerts(quotes, compile_rules({}, ['A', 'B', 'C', 'D']), {'C': -2.5, 'D': -1.0})
+        assert {a['symbol']: a['level'] for a in alerts} == {'B': -1.0, 'D': -1.5}
+        assert {a['key'] for a in alerts} == {'B', 'D'}
+
+
+class TestAlertRules:
+    def evaluate(self, spec, quotes, last_sent=None):
+        from src.alert_engine import evaluate_alerts
+        from src.rules import compile_rules
+        rules = compile_rules(spec, [q['symbol'] for q in quotes])
+        return evaluate_alerts(quotes, rules, last_sent or {})
+
+    def test_per_symbol_ladder_overrides_default(self):
+        spec = {'VVSM.DE': [{'type': 'drop', 'first': -2.0, 'step': -1.0}]}
+        quotes = [
+            {'symbol': 'VVSM.DE', 'price': 98.5, 'change_pct': -1.5},
+            {'symbol': 'ISAC.L', 'price': 98.5, 'change_pct': -1.5},
+        ]
+        alerts = self.evaluate(spec, quotes)
+        assert [(a['symbol'], a['level']) for a in alerts] == [('ISAC.L', -1.5)]
+
+    def test_rise_rule(self):
+        spec = {'*': [{'type': 'rise', 'first': 1.0, 'step': 0.5}]}
+        alerts = self.evaluate(spec, [{'symbol': 'CSPX.L', 'price': 101.7, 'change_pct': 1.7}], {'CSPX.L:rise': 1.0})
+        assert [(a['key'], a['level']) for a in alerts] == [('CSPX.L:rise', 1.5)]
+
+    def test_drop_from_intraday_high(self):
+        spec = {'*': [{'type': 'drop_from_high', 'first': -2.0, 'step': -1.0}]}
+        quotes = [{'symbol': 'FLXC.DE', 'price': 97.0, 'change_pct': 0.5, 'day_high': 100.0}]
+        alerts = self.evaluate(spec, quotes)
+        assert [(a['rule'], a['level']) for a in alerts] == [('drop_from_high', -3.0)]
+
+    def test_volatility_band(self):
+        from src import rules
+        spec = {'*': [{'type': 'volatility', 'window': 4, 'band': 2.0}]}
+        with patch.dict('src.rules.price_windows', clear=True):
+            for price in (100.0, 100.2, 99.8, 100.0):
+                assert self.evaluate(spec, [{'symbol': 'X', 'price': price, 'change_pct': 0.0}]) == []
+            alerts = self.evaluate(spec, [{'symbol': 'X', 'price': 95.0, 'change_pct': -5.0}])
+            assert len(rules.price_windows['X']) == 4
+        assert [a['rule'] for a in alerts] == ['volatility_down']
+        assert alerts[0]['value'] < -2.0
+
+    def test_rules_file_compiled_once(self, tmp_path):
+        from src import rules
+        path = str(tmp_path / 'alert_rules.json')
+        with open(path, 'w') as f:
+            json.dump({'ISAC.L': [{'type': 'rise', 'first': 1.0, 'step': 1.0}]}, f)
+        with patch('src.rules.ALERT_RULES_FILE', path), \
+             patch('src.rules.compiled_rules', None):
+            first = rules.get_rules()
+            assert rules.get_rules() is first
+        assert [r.name for r in first['ISAC.L'].rules] == ['rise']
+        assert [r.name for r in first['CSPX.L'].rules] == ['drop']
+
+    def test_invalid_rule_entries_skipped(self, tmp_path):
+        from src import rules
+        path = str(tmp_path / 'alert_rules.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'VVSM.DE': [{'type': 'drop', 'first': -2.0}],
+                'ISAC.L': [{'type': 'moon'}, {'type': 'rise', 'first': 1.0, 'step': 1.0}],
+                'CNDX.L': [{'type': 'drop', 'first': '-2', 'step': -1.0}],
+            }, f)
+        with patch('src.rules.ALERT_RULES_FILE', path), \
+             patch('src.rules.compiled_rules', None), \
+             patch('src.rules.log_to_file') as mock_log:
+            compiled = rules.get_rules()
+        assert mock_log.call_count == 3
+        assert [r.name for r in compiled['VVSM.DE'].rules] == ['drop']
+        assert compiled['VVSM.DE'].rules[0].step == rules.ALERT_THRESHOLD_STEP
+        assert [r.name for r in compiled['ISAC.L'].rules] == ['rise']
+        assert [r.name for r in compiled['CNDX.L'].rules] == ['drop']
+
+    def test_unparseable_rules_file_keeps_last_good_rules(self, tmp_path):
+        from src import rules
+        path = str(tmp_path / 'alert_rules.json')
+        with open(path, 'w') as f:
+            json.dump({'ISAC.L': [{'type': 'rise', 'first': 1.0, 'step': 1.0}]}, f)
+        with patch('src.rules.ALERT_RULES_FILE', path), \
+             patch('src.rules.compiled_rules', None), \
+             patch('src.rules.log_to_file') as mock_log:
+            good = rules.get_rules()
+            with open(path, 'w') as f:
+                f.write('{"ISAC.L": [')
+            os.utime(path, (time.time() + 5, time.time() + 5))
+            assert rules.get_rules() is good
+            assert rules.get_rules() is good
+        mock_log.assert_called_once()
+
+    def test_bad_rules_file_does_not_stop_cycle(self, tmp_path):
+        path = str(tmp_path / 'alert_rules.json')
+        with open(path, 'w') as f:
+            json.dump({'VVSM.DE': [{'type': 'drop', 'first': -2.0}]}, f)
+        with patch('src.rules.ALERT_RULES_FILE', path), \
+             patch('src.rules.compiled_rules', None), \
+             patch('src.price_checker.get_provider') as mock_provider, \
+             patch('src.price_checker.queue_chat_alerts') as mock_queue, \
+             patch('src.price_checker.get_alert_thresholds', return_value={}), \
+             patch('src.price_checker.record_alert_threshold'), \
+             patch('src.price_checker.flush_alert_thresholds'), \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            mock_provider.return_value.fetch.return_value = [
+                ('ISAC.L', {'regularMarketPrice': 98.7, 'previousClose': 100.0}, None)]
+            check_prices(['ISAC.L'])
+        mock_queue.assert_called_once()
+        assert price_checker_module.get_last_check_status()['success'] is True
+
+    def test_unknown_rule_type(self):
+        from src.rules import compile_rules
+        with pytest.raises(ValueError):
+            compile_rules({'*': [{'type': 'moon'}]}, ['ISAC.L'])
+
+
+class TestAlertState:
+    def test_batched_updates_written_once(self, tmp_path):
+        from src.alerts import AlertState
+        path = str(tmp_path / "alert_thresholds")
+        state = AlertState(path)
+        state.set('ISAC.L', -1.0)
+        state.set('CSPX.L:rise', 1.5)
+        assert not os.path.exists(path)
+        with patch('src.alerts.os.replace', wraps=os.replace) as mock_replace:
+            state.flush()
+            state.flush()
+        mock_replace.assert_called_once()
+        with open(path) as f:
+            data = json.load(f)
+        assert data['thresholds'] == {'ISAC.L': -1.0, 'CSPX.L:rise': 1.5}
+        assert sorted(os.listdir(tmp_path)) == ['alert_thresholds', 'alert_thresholds.lock']
+
+    def test_file_only_reparsed_when_changed(self, tmp_path):
+        from src.alerts import AlertState
+        path = str(tmp_path / "alert_thresholds")
+        writer = AlertState(path)
+        writer.set('ISAC.L', -1.0)
+        writer.flush()
+        reader = AlertState(path)
+        assert reader.get() == {'ISAC.L': -1.0}
+        with patch('src.alerts.json.load') as mock_load:
+            assert reader.get() == {'ISAC.L': -1.0}
+        mock_load.assert_not_called()
+
+    def test_failed_write_keeps_previous_file(self, tmp_path):
+        from src.alerts import AlertState
+        path = str(tmp_path / "alert_thresholds")
+        state = AlertState(path)
+        state.set('ISAC.L', -1.0)
+        state.flush()
+        state.set('ISAC.L', -1.5)
+        with patch('src.alerts.json.dump', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                state.flush()
+        with open(path) as f:
+            assert json.load(f)['thresholds'] == {'ISAC.L': -1.0}
+        assert sorted(os.listdir(tmp_path)) == ['alert_thresholds', 'alert_thresholds.lock']
+
+    def test_overlapping_flushes_merge(self, tmp_path):
+        from src.alerts import AlertState
+        path = str(tmp_path / "alert_thresholds")
+        first = AlertState(path)
+        second = AlertState(path)
+        first.get()
+        second.get()
+        first.set('ISAC.L', -1.0)
+        second.set('CNDX.L', -2.0)
+        second.set('ISAC.L', -1.5)
+        second.flush()
+        first.flush()
+        with open(path) as f:
+            assert json.load(f)['thresholds'] == {'ISAC.L': -1.5, 'CNDX.L': -2.0}
+        assert first.get() == {'ISAC.L': -1.5, 'CNDX.L': -2.0}
+
+
+class TestLogWriter:
+    def test_structured_records_and_batching(self, tmp_path):
+        log_dir = str(tmp_path)
+        with patch('src.logs.LOG_DIR', log_dir):
+            from src.logs import log_to_file, flush_logs
+            for i in range(50):
+                log_to_file(f"ISAC.L price {i}", symbol='ISAC.L', price=float(i))
+            log_to_file("Error checking CSPX.L: boom", level="ERROR", symbol='CSPX.L')
+            assert flush_logs()
+        today = datetime.now().strftime('%Y-%m-%d')
+        with open(os.path.join(log_dir, f"{today}.jsonl")) as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 51
+        assert records[0]['symbol'] == 'ISAC.L'
+        assert records[-1]['level'] == 'ERROR'
+        with open(os.path.join(log_dir, f"{today}.log")) as f:
+            assert len(f.readlines()) == 51
+
+    def test_rollover_opens_new_day_file(self, tmp_path):
+        from src.logs import LogWriter
+        writer = LogWriter()
+        with patch('src.logs.LOG_DIR', str(tmp_path)):
+            writer.write_batch([('2026-02-09', '[23:59:59] a', {'message': 'a'})])
+            writer.write_batch([('2026-02-10', '[00:00:01] b', {'message': 'b'})])
+        writer.close_files()
+        assert sorted(os.listdir(tmp_path)) == ['2026-02-09.jsonl', '2026-02-09.log', '2026-02-10.jsonl', '2026-02-10.log']
+
+    def test_batch_written_in_one_call_per_file(self, tmp_path):
+        from src.logs import LogWriter
+        writer = LogWriter()
+        batch = [('2026-02-09', f'[12:00:00] line {i}', {'message': f'line {i}'}) for i in range(500)]
+        with patch('src.logs.LOG_DIR', str(tmp_path)), \
+             patch('src.logs.os.write', wraps=os.write) as mock_write:
+            writer.write_batch(batch)
+        writer.close_files()
+        assert mock_write.call_count == 2
+        with open(tmp_path / '2026-02-09.jsonl') as f:
+            assert [json.loads(line)['message'] for line in f] == [f'line {i}' for i in range(500)]
+
+
+class TestLogsEndpoint:
+    @pytest.fixture
+    def log_dir(self, tmp_path):
+        today = datetime.now().strftime('%Y-%m-%d')
+        with open(tmp_path / f"{today}.jsonl", 'w') as f:
+            for i in range(250):
+                symbol = 'ISAC.L' if i % 2 else 'CSPX.L'
+                level = 'ERROR' if i % 50 == 0 else 'INFO'
+                f.write(json.dumps({'ts': f'{today}T12:00:00', 'level': level, 'symbol': symbol, 'message': f'line {i}'}) + '\n')
+        with patch('src.log_reader.LOG_DIR', str(tmp_path)):
+            yield tmp_path
+
+    def test_tail_returns_newest_lines(self, client, log_dir):
+        data = json.loads(client.get('/logs?limit=3').data)
+        assert data['logs'] == ['[12:00:00] line 247', '[12:00:00] line 248', '[12:00:00] line 249']
+        assert data['next_offset'] == 3
+
+    def test_offset_pages_backwards(self, client, log_dir):
+        data = json.loads(client.get('/logs?limit=2&offset=2').data)
+        assert data['logs'] == ['[12:00:00] line 246', '[12:00:00] line 247']
+
+    def test_limit_and_offset_clamped(self, client, log_dir):
+        data = client.get('/logs?limit=-1').get_json()
+        assert data['count'] == 1
+        assert data['next_offset'] == 1
+        data = client.get('/logs?limit=0&offset=-5').get_json()
+        assert data['count'] == 1
+        assert data['logs'][0] == client.get('/logs?limit=1').get_json()['logs'][0]
+
+    def test_filters_by_symbol_and_level(self, client, log_dir):
+        data = json.loads(client.get('/logs?symbol=CSPX.L&level=error&limit=10').data)
+        assert data['logs'] == ['[12:00:00] line 0', '[12:00:00] line 50', '[12:00:00] line 100',
+                                '[12:00:00] line 150', '[12:00:00] line 200']
+        assert 'next_offset' not in data
+
+    def test_since_cursor_returns_only_new_lines(self, client, log_dir):
+        cursor = json.loads(client.get('/logs?limit=1').data)['cursor']
+        today = datetime.now().strftime('%Y-%m-%d')
+        with open(log_dir / f"{today}.jsonl", 'a') as f:
+            f.write(json.dumps({'ts': f'{today}T12:05:00', 'level': 'INFO', 'message': 'fresh'}) + '\n')
+            f.write('{"ts": "partial')
+        data = json.loads(client.get(f'/logs?since={cursor}').data)
+        assert data['logs'] == ['[12:05:00] fresh']
+        assert data['cursor'] > cursor
+
+    def test_backward_reader_handles_block_boundaries(self, tmp_path):
+        from src.log_reader import read_lines_backward
+        path = str(tmp_path / "x.log")
+        with open(path, 'wb') as f:
+            f.write(b"one\ntwo\n\nthree-long-line\nfour\npartial")
+        with patch('src.log_reader.BLOCK_SIZE', 5):
+            assert list(read_lines_backward(path)) == [b'four', b'three-long-line', b'two', b'one']
+
+    def test_invalid_date_rejected(self, client, log_dir):
+        assert client.get('/logs?date=../../etc/passwd').status_code == 400
+
+    def test_stream_sends_new_lines(self, client, log_dir):
+        with patch('src.routes.LOG_STREAM_SECONDS', 0.5):
+            response = client.get('/logs/stream', headers={'Last-Event-ID': '0'})
+            body = response.get_data(as_text=True)
+        assert response.mimetype == 'text/event-stream'
+        assert body.count('data: ') == 250
+        assert body.count('id: ') == 1
+
+
+class TestStatusPush:
+    def test_etag_not_modified(self, client):
+        status_store.publish({'timestamp': 't', 'results': [], 'success': True})
+        first = client.get('/status')
+        assert first.headers['ETag'] == '"1"'
+        second = client.get('/status', headers={'If-None-Match': first.headers['ETag']})
+        assert second.status_code == 304
+        assert second.data == b''
+        status_store.publish({'timestamp': 't2', 'results': [], 'success': True})
+        assert client.get('/status', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+    def test_diff_contains_only_changed_symbols(self):
+        from src.status_feed import diff_status
+        old = {'results': [{'symbol': 'A', 'price': 1}, {'symbol': 'B', 'price': 2}, {'symbol': 'C', 'price': 3}]}
+        new = {'timestamp': 't', 'success': True, 'results': [{'symbol': 'A', 'price': 1}, {'symbol': 'B', 'price': 5}]}
+        diff = diff_status(old, new)
+        assert diff['changed'] == [{'symbol': 'B', 'price': 5}]
+        assert diff['removed'] == ['C']
+
+    def test_stream_pushes_snapshot_then_diff(self, client):
+        import threading
+        import time
+        status_store.publish({'timestamp': 't1', 'success': True, 'results': [
+            {'symbol': 'A', 'price': 1}, {'symbol': 'B', 'price': 2}]})
+        db_path = status_store.STATUS_DB
+
+        def publish_later():
+            time.sleep(0.2)
+            with patch('src.status_store.STATUS_DB', db_path):
+                status_store.publish({'timestamp': 't2', 'success': True, 'results': [
+                    {'symbol': 'A', 'price': 1}, {'symbol': 'B', 'price': 3}]})
+
+        with patch('src.routes.STATUS_STREAM_SECONDS', 0.6), \
+             patch('src.status_feed.STATUS_POLL_SECONDS', 0.05):
+            thread = threading.Thread(target=publish_later)
+            thread.start()
+            body = client.get('/status/stream').get_data(as_text=True)
+            thread.join()
+
+        events = [e for e in body.split('\n\n') if e.startswith('id:')]
+        assert events[0].startswith('id: 1\nevent: snapshot')
+        assert events[1].startswith('id: 2\nevent: diff')
+        diff = json.loads(events[1].split('data: ', 1)[1])
+        assert diff['changed'] == [{'symbol': 'B', 'price': 3}]
+
+    def test_stream_skips_snapshot_client_already_has(self, client):
+        status_store.publish({'timestamp': 't1', 'success': True, 'results': []})
+        with patch('src.routes.STATUS_STREAM_SECONDS', 0.1):
+            body = client.get('/status/stream', headers={'Last-Event-ID': '1'}).get_data(as_text=True)
+        assert 'event: snapshot' not in body
+
+    def test_streams_capped_per_worker(self, client):
+        import threading
+        status_store.publish({'timestamp': 't1', 'success': True, 'results': []})
+        with patch('src.routes.stream_slots', threading.BoundedSemaphore(1)), \
+             patch('src.routes.STATUS_STREAM_SECONDS', 0.1):
+            held = client.get('/status/stream', buffered=False)
+            assert held.status_code == 200
+            assert client.get('/status/stream').status_code == 503
+            assert client.get('/health').status_code == 200
+            held.close()
+            assert client.get('/status/stream').status_code == 200
+
+
+class TestNotifier:
+    def test_cycle_alerts_coalesced_into_digest(self):
+        from src import notifier
+        notifier.queue_chat_alerts({"42": ["📉 Price Alert: A", "📉 Price Alert: B", "📈 Price Rise: C"]})
+        rows = notifier.get_connection(notifier.NOTIFY_DB, notifier.SCHEMA).execute("SELECT text FROM outbox").fetchall()
+        assert len(rows) == 1
+        assert rows[0][0].startswith("🚨 3 alerts")
+        assert "Price Rise: C" in rows[0][0]
+
+    def test_digest_split_at_telegram_limit(self):
+        from src.notifier import build_digest
+        messages = ["x" * 1500 for _ in range(5)]
+        digests = build_digest(messages)
+        assert len(digests) == 3
+        assert all(len(d) <= 4096 for d in digests)
+
+    @patch('src.notifier.deliver')
+    def test_successful_send_removes_message(self, mock_deliver):
+        from src import notifier
+        notifier.queue_chat_alerts({"42": ["hello"]})
+        assert notifier.process_next() is True
+        mock_deliver.assert_called_once_with("hello", "42")
+        assert notifier.get_metrics()["pending"] == 0
+        assert notifier.process_next() is False
+
+    @patch('src.notifier.deliver')
+    def test_failed_send_is_retried_later(self, mock_deliver):
+        import time
+        from src import notifier
+        from src.telegram import TelegramError
+        mock_deliver.side_effect = TelegramError("Rate limited by Telegram", retry_after=7)
+        notifier.queue_chat_alerts({"42": ["hello"]})
+        before = time.time()
+        assert notifier.process_next() is True
+        row = notifier.get_connection(notifier.NOTIFY_DB, notifier.SCHEMA).execute(
+            "SELECT attempts, next_attempt FROM outbox").fetchone()
+        assert row[0] == 1
+        assert row[1] >= before + 7
+        assert notifier.process_next() is False
+
+    @patch('src.notifier.deliver', side_effect=ConnectionError("down"))
+    def test_message_dropped_after_max_attempts(self, mock_deliver):
+        from src import notifier
+        notifier.queue_chat_alerts({"42": ["hello"]})
+        conn = notifier.get_connection(notifier.NOTIFY_DB, notifier.SCHEMA)
+        with patch('src.notifier.NOTIFY_MAX_ATTEMPTS', 2):
+            notifier.process_next()
+            conn.execute("UPDATE outbox SET next_attempt = 0")
+            notifier.process_next()
+        assert notifier.get_metrics()["pending"] == 0
+
+    def test_token_bucket_limits_rate(self):
+        from src.notifier import TokenBucket
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert 0 < bucket.take() <= 1.0
+
+    def test_notifications_endpoint(self, client):
+        data = json.loads(client.get('/notifications').data)
+        assert data['pending'] == 0
+        assert 'sent' in data
+
+
+class TestChangeDetection:
+    def run_cycle(self, quotes, now):
+        from src.quotes import ChartQuoteProvider
+        provider = ChartQuoteProvider()
+        with patch('src.price_checker.get_provider', return_value=provider), \
+             patch('src.quotes.ChartQuoteProvider.fetch_one', side_effect=lambda s: dict(quotes[s])) as mock_fetch, \
+             patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.log_to_file'), \
+             patch('src.price_checker.cleanup_old_logs'), \
+             patch('src.price_checker.cleanup_alert_file'), \
+             patch('src.price_checker.get_alert_thresholds', return_value={}):
+            mock_dt.now.return_value = now
+            check_prices()
+        return sorted(call.args[0] for call in mock_fetch.call_args_list)
+
+    def quotes(self, price=100.0, market_time=1000, start=None, end=None):
+        now_ts = int(datetime(2026, 2, 9, 12, 0, 0).timestamp())
+        period = {'regular': {'start': start or now_ts - 3600, 'end': end or now_ts + 3600}}
+        return {
+            symbol: {'regularMarketPrice': price, 'previousClose': 100.0,
+                     'regularMarketTime': market_time, 'currentTradingPeriod': period}
+            for symbol in SYMBOLS
+        }
+
+    def test_unchanged_quotes_do_not_republish(self):
+        self.run_cycle(self.quotes(), datetime(2026, 2, 9, 12, 0, 0))
+        version = status_store.load()[0]
+        self.run_cycle(self.quotes(), datetime(2026, 2, 9, 12, 5, 0))
+        assert status_store.load()[0] == version
+
+    def test_only_changed_symbols_updated(self):
+        self.run_cycle(self.quotes(), datetime(2026, 2, 9, 12, 0, 0))
+        quotes = self.quotes()
+        quotes['CSPX.L'] = dict(quotes['CSPX.L'], regularMarketPrice=101.0, regularMarketTime=1300)
+        self.run_cycle(quotes, datetime(2026, 2, 9, 12, 5, 0))
+        results = {r['symbol']: r for r in price_checker_module.get_last_check_status()['results']}
+        assert results['CSPX.L']['price'] == 101.0
+        assert results['ISAC.L']['price'] == 100.0
+        assert len(results) == len(SYMBOLS)
+
+    def test_closed_session_polled_less_often(self):
+        closed_at = int(datetime(2026, 2, 9, 11, 0, 0).timestamp())
+        quotes = self.quotes(start=closed_at - 3600, end=closed_at)
+        assert len(self.run_cycle(quotes, datetime(2026, 2, 9, 12, 0, 0))) == len(SYMBOLS)
+        assert self.run_cycle(quotes, datetime(2026, 2, 9, 12, 5, 0)) == []
+        assert len(self.run_cycle(quotes, datetime(2026, 2, 9, 12, 31, 0))) == len(SYMBOLS)
+
+    def test_symbol_skipped_until_session_opens(self):
+        opens_at = int(datetime(2026, 2, 9, 13, 0, 0).timestamp())
+        quotes = self.quotes(start=opens_at, end=opens_at + 3600)
+        self.run_cycle(quotes, datetime(2026, 2, 9, 12, 0, 0))
+        assert self.run_cycle(quotes, datetime(2026, 2, 9, 12, 55, 0)) == []
+        assert len(self.run_cycle(quotes, datetime(2026, 2, 9, 13, 0, 0))) == len(SYMBOLS)
+
+
+class TestMarketCalendar:
+    def test_exchange_for_symbol_suffix(self):
+        from src.market_calendar import exchange_for, DEFAULT_EXCHANGE
+        assert exchange_for('BP.L').name == 'LSE'
+        assert exchange_for('SAP.DE').name == 'XETRA'
+        assert exchange_for('PKN.WA').name == 'GPW'
+        assert exchange_for('AAPL') is DEFAULT_EXCHANGE
+
+    def test_easter_dates(self):
+        from src.market_calendar import easter_sunday
+        assert easter_sunday(2024) == date(2024, 3, 31)
+        assert easter_sunday(2026) == date(2026, 4, 5)
+
+    def test_session_hours_in_exchange_timezone(self):
+        from src.market_calendar import EXCHANGES
+        lse, gpw = EXCHANGES['LSE'], EXCHANGES['GPW']
+        # 16:45 in Warsaw is 15:45 in London: both open
+        at = datetime(2026, 2, 9, 16, 45, tzinfo=ZoneInfo('Europe/Warsaw'))
+        assert lse.is_open(at) and gpw.is_open(at)
+        # 17:15 in Warsaw: GPW closed, LSE still trading
+        at = datetime(2026, 2, 9, 17, 15, tzinfo=ZoneInfo('Europe/Warsaw'))
+        assert lse.is_open(at) and not gpw.is_open(at)
+
+    def test_holidays_and_weekends_closed(self):
+        from src.market_calendar import EXCHANGES
+        good_friday = datetime(2026, 4, 3, 12, 0, tzinfo=ZoneInfo('Europe/Berlin'))
+        assert not any(e.is_open(good_friday) for e in EXCHANGES.values())
+        corpus_christi = datetime(2026, 6, 4, 12, 0, tzinfo=ZoneInfo('Europe/Warsaw'))
+        assert not EXCHANGES['GPW'].is_open(corpus_christi)
+        assert EXCHANGES['XETRA'].is_open(corpus_christi)
+        # Boxing Day 2026 is a Saturday, the UK substitute day is Monday the 28th
+        assert not EXCHANGES['LSE'].is_open(datetime(2026, 12, 28, 12, 0, tzinfo=ZoneInfo('Europe/London')))
+
+    def test_next_open_skips_weekend_and_holidays(self):
+        from src.market_calendar import EXCHANGES
+        gpw = EXCHANGES['GPW']
+        friday_evening = datetime(2026, 4, 2, 18, 0, tzinfo=ZoneInfo('Europe/Warsaw'))
+        assert gpw.next_open(friday_evening) == datetime(2026, 4, 7, 9, 0, tzinfo=ZoneInfo('Europe/Warsaw'))
+        before_open = datetime(2026, 2, 9, 8, 0, tzinfo=ZoneInfo('Europe/Warsaw'))
+        assert gpw.next_open(before_open) == datetime(2026, 2, 9, 9, 0, tzinfo=ZoneInfo('Europe/Warsaw'))
+
+    def test_check_prices_only_fetches_open_exchanges(self):
+        at = datetime(2026, 2, 9, 17, 15, tzinfo=ZoneInfo('Europe/Warsaw'))
+        with patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.get_provider') as mock_provider:
+            mock_dt.now.return_value = at
+            mock_provider.return_value.fetch.return_value = []
+            check_prices()
+        fetched = mock_provider.return_value.fetch.call_args[0][0]
+        assert fetched and all(s.endswith('.L') or s.endswith('.DE') for s in fetched)
+
+    def test_closed_exchange_job_sleeps_until_open(self):
+        from src import scheduler
+        from src.market_calendar import EXCHANGES
+        with patch.object(scheduler.scheduler, 'modify_job') as mock_modify, \
+             patch('src.scheduler.check_prices') as mock_check, \
+             patch('src.market_calendar.Exchange.is_open', return_value=False):
+            scheduler.run_scheduled_check('GPW', ['PKN.WA'])
+        mock_check.assert_not_called()
+        job, = mock_modify.call_args[0]
+        assert job == 'price_check_GPW'
+        assert mock_modify.call_args[1]['next_run_time'].tzinfo == EXCHANGES['GPW'].timezone
+
+
+class TestAdaptivePolling:
+    def checked(self, symbol, change_pct):
+        from src import change_tracker
+        result = {'symbol': symbol, 'status': 'checked', 'price': 100 + change_pct, 'change_pct': change_pct}
+        change_tracker.set_result(symbol, result)
+        change_tracker.mark_polled(symbol, 1000)
+        return result
+
+    def test_alert_distance_to_next_level(self):
+        from src.poll_planner import alert_distance
+        from src.rules import compile_rules
+        rules = compile_rules({}, ['ISAC.L'])['ISAC.L']
+        result = self.checked('ISAC.L', -0.9)
+        assert alert_distance(result, rules, {}) == pytest.approx(0.1)
+        # -1.0 already alerted, next level is -1.5
+        result = self.checked('ISAC.L', -1.2)
+        assert alert_distance(result, rules, {'ISAC.L': -1.0}) == pytest.approx(0.3)
+
+    def test_near_and_volatile_symbol_polled_more_often(self):
+        from src import poll_planner
+        from src.rules import compile_rules
+        rules = compile_rules({}, ['ISAC.L', 'CNDX.L'])
+        for ts, (near, calm) in enumerate([(-0.5, 0.2), (-0.7, 0.2), (-0.9, 0.2)]):
+            poll_planner.record_sample('ISAC.L', 60 * ts, near)
+            poll_planner.record_sample('CNDX.L', 60 * ts, calm)
+        self.checked('ISAC.L', -0.9)
+        self.checked('CNDX.L', 0.2)
+        with patch('src.poll_planner.POLL_BUDGET_PER_MINUTE', 100):
+            intervals = poll_planner.plan(['ISAC.L', 'CNDX.L'], rules, {})
+        assert intervals['ISAC.L'] == poll_planner.POLL_MIN_INTERVAL
+        assert intervals['CNDX.L'] == poll_planner.POLL_MAX_INTERVAL
+
+    def test_intervals_scaled_to_request_budget(self):
+        from src import poll_planner
+        from src.rules import compile_rules
+        symbols = SYMBOLS
+        rules = compile_rules({}, symbols)
+        for symbol in symbols:
+            poll_planner.record_sample(symbol, 0, -0.5)
+            poll_planner.record_sample(symbol, 60, -0.9)
+            self.checked(symbol, -0.9)
+        with patch('src.poll_planner.POLL_BUDGET_PER_MINUTE', 4):
+            intervals = poll_planner.plan(symbols, rules, {})
+        assert sum(60 / i for i in intervals.values()) == pytest.approx(4)
+
+    def test_symbol_not_polled_before_planned_time(self):
+        from src import change_tracker
+        self.checked('ISAC.L', 0.0)
+        change_tracker.schedule('ISAC.L', 120)
+        assert not change_tracker.should_poll('ISAC.L', 1100)
+        assert change_tracker.should_poll('ISAC.L', 1120)
+
+    def test_tick_without_due_symbols_does_nothing(self):
+        from src import change_tracker
+        now = datetime(2026, 2, 9, 12, 0, 0)
+        for symbol in SYMBOLS:
+            change_tracker.mark_polled(symbol, int(now.timestamp()))
+            change_tracker.schedule(symbol, 300)
+        with patch('src.price_checker.get_provider') as mock_provider, \
+             patch('src.price_checker.cleanup_alert_file') as mock_cleanup, \
+             patch('src.price_checker.log_to_file') as mock_log, \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = now
+            check_prices()
+        mock_provider.assert_not_called()
+        mock_cleanup.assert_not_called()
+        mock_log.assert_not_called()
+        assert price_checker_module.get_last_check_status() is None
+
+    def test_housekeeping_runs_on_slower_cadence(self):
+        with patch('src.price_checker.cleanup_alert_file') as mock_cleanup, \
+             patch('src.price_checker.cleanup_old_logs'):
+            price_checker_module.housekeeping(datetime(2026, 2, 9, 12, 0, 0))
+            price_checker_module.housekeeping(datetime(2026, 2, 9, 12, 5, 0))
+            assert mock_cleanup.call_count == 1
+            price_checker_module.housekeeping(datetime(2026, 2, 9, 12, 10, 0))
+            assert mock_cleanup.call_count == 2
+
+
+class TestQuoteCache:
+    now = datetime(2026, 2, 9, 12, 0, 0, tzinfo=ZoneInfo('Europe/London'))
+
+    def fetcher(self):
+        calls = []
+
+        def fetch(symbols):
+            calls.append(list(symbols))
+            return [(symbol, {'regularMarketPrice': 1.0, 'symbol': symbol}, None) for symbol in symbols]
+        return fetch, calls
+
+    def test_fresh_quotes_served_from_cache(self):
+        cache = QuoteCache()
+        fetch, calls = self.fetcher()
+        cache.fetch(['ISAC.L', 'CNDX.L'], fetch, self.now)
+        results = cache.fetch(['CNDX.L', 'ISAC.L', 'CSPX.L'], fetch, self.now + timedelta(seconds=10))
+        assert [r[0] for r in results] == ['CNDX.L', 'ISAC.L', 'CSPX.L']
+        assert calls == [['ISAC.L', 'CNDX.L'], ['CSPX.L']]
+
+    def test_expired_and_forced_refetch(self):
+        cache = QuoteCache()
+        fetch, calls = self.fetcher()
+        cache.fetch(['ISAC.L'], fetch, self.now)
+        cache.fetch(['ISAC.L'], fetch, self.now + timedelta(seconds=31))
+        cache.fetch(['ISAC.L'], fetch, self.now + timedelta(seconds=32), force=True)
+        assert len(calls) == 3
+
+    def test_closed_exchange_quotes_kept_longer(self):
+        cache = QuoteCache()
+        fetch, calls = self.fetcher()
+        saturday = datetime(2026, 2, 7, 12, 0, 0, tzinfo=ZoneInfo('Europe/London'))
+        cache.fetch(['ISAC.L'], fetch, saturday)
+        cache.fetch(['ISAC.L'], fetch, saturday + timedelta(minutes=10))
+        assert len(calls) == 1
+
+    def test_errors_not_cached(self):
+        cache = QuoteCache()
+        cache.fetch(['ISAC.L'], lambda symbols: [('ISAC.L', None, ValueError('boom'))], self.now)
+        fetch, calls = self.fetcher()
+        assert cache.fetch(['ISAC.L'], fetch, self.now)[0][2] is None
+        assert calls == [['ISAC.L']]
+
+    def test_lru_eviction(self):
+        cache = QuoteCache(max_entries=2)
+        fetch, calls = self.fetcher()
+        cache.fetch(['ISAC.L', 'CNDX.L'], fetch, self.now)
+        cache.fetch(['ISAC.L'], fetch, self.now)
+        cache.fetch(['CSPX.L'], fetch, self.now)
+        assert list(cache.entries) == ['ISAC.L', 'CSPX.L']
+
+    def test_concurrent_requests_share_one_fetch(self):
+        import threading
+        cache = QuoteCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_fetch(symbols):
+            calls.append(list(symbols))
+            started.set()
+            release.wait(5)
+            return [(symbol, {'regularMarketPrice': 2.0}, None) for symbol in symbols]
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.fetch(['ISAC.L'], slow_fetch, self.now)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(cache.fetch(['ISAC.L'], slow_fetch, self.now)))
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+        assert calls == [['ISAC.L']]
+        assert [r[0][1]['regularMarketPrice'] for r in results] == [2.0, 2.0]
+
+    def test_manual_check_polls_every_open_symbol(self, client):
+        from src import change_tracker
+        change_tracker.get_state('ISAC.L').next_poll = 4102444800
+        change_tracker.get_state('ISAC.L').last_polled = 0
+        with patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.get_provider') as mock_provider:
+            mock_dt.now.return_value = self.now
+            mock_provider.return_value.fetch.return_value = []
+            client.post('/check-prices?force=1')
+            run_queued_job()
+        assert 'ISAC.L' in mock_provider.return_value.fetch.call_args[0][0]
+
+    def test_manual_job_reuses_scheduled_fetch(self, client):
+        def fetch(symbols):
+            return [(symbol, {'regularMarketPrice': 101.0, 'previousClose': 100.0}, None) for symbol in symbols]
+
+        with patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.get_provider') as mock_provider, \
+             patch('src.price_checker.queue_chat_alerts'):
+            mock_dt.now.return_value = self.now
+            mock_provider.return_value.fetch.side_effect = fetch
+            check_prices()
+            scheduled_calls = mock_provider.return_value.fetch.call_count
+            mock_dt.now.return_value = self.now + timedelta(seconds=10)
+            client.post('/check-prices')
+            assert run_queued_job()
+        assert scheduled_calls >= 1
+        assert mock_provider.return_value.fetch.call_count == scheduled_calls
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        from src.circuit_breaker import CircuitBreaker, CircuitOpen
+        breaker = CircuitBreaker('example.com', failure_threshold=3, reset_timeout=30)
+        for _ in range(2):
+            breaker.record_failure()
+        breaker.before()
+        breaker.record_failure()
+        assert breaker.report()['state'] == 'open'
+        with pytest.raises(CircuitOpen):
+            breaker.before()
+
+    def test_half_open_lets_one_probe_through(self):
+        from src.circuit_breaker import CircuitBreaker, CircuitOpen
+        breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        with patch('src.circuit_breaker.time.monotonic', return_value=time.monotonic() + 31):
+            breaker.before()
+            with pytest.raises(CircuitOpen):
+                breaker.before()
+        breaker.record_success()
+        assert breaker.report()['state'] == 'closed'
+        breaker.before()
+
+    def test_failed_probe_reopens(self):
+        from src.circuit_breaker import CircuitBreaker, CircuitOpen
+        breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        with patch('src.circuit_breaker.time.monotonic', return_value=time.monotonic() + 31):
+            breaker.before()
+            breaker.record_failure()
+            with pytest.raises(CircuitOpen):
+                breaker.before()
+
+    def test_score_tracks_recent_outcomes(self):
+        from src.circuit_breaker import CircuitBreaker
+        breaker = CircuitBreaker('example.com')
+        breaker.record_failure()
+        degraded = breaker.report()['score']
+        breaker.record_success()
+        assert degraded < breaker.report()['score'] < 1.0
+
+    @patch('src.http_client.time.sleep')
+    def test_http_client_fails_fast_once_open(self, mock_sleep):
+        import requests
+        from src import http_client
+        from src.circuit_breaker import CircuitBreaker, CircuitOpen, breakers
+        breakers['down.example.com'] = CircuitBreaker('down.example.com', failure_threshold=2)
+        session = MagicMock()
+        session.request.side_effect = requests.ConnectionError()
+        with patch('src.http_client.get_session', return_value=session):
+            with pytest.raises(CircuitOpen):
+                http_client.get('https://down.example.com/x', retries=5)
+            with pytest.raises(CircuitOpen):
+                http_client.get('https://down.example.com/y')
+        assert session.request.call_count == 2
+
+    def test_probe_failing_with_other_request_error_reopens(self):
+        import requests
+        from src import http_client
+        from src.circuit_breaker import CircuitBreaker, breakers
+        breaker = breakers['flaky.example.com'] = CircuitBreaker('flaky.example.com', failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        session = MagicMock()
+        session.request.side_effect = requests.exceptions.ChunkedEncodingError()
+        with patch('src.http_client.get_session', return_value=session), \
+             patch('src.circuit_breaker.time.monotonic', return_value=time.monotonic() + 31):
+            with pytest.raises(requests.exceptions.ChunkedEncodingError):
+                http_client.get('https://flaky.example.com/x')
+        assert breaker.report()['state'] == 'open'
+        assert not breaker.probing
+        assert session.request.call_count == 1
+
+    def test_stale_probe_expires(self):
+        from src.circuit_breaker import CircuitBreaker, CircuitOpen
+        breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        start = time.monotonic()
+        with patch('src.circuit_breaker.time.monotonic', return_value=start + 31):
+            breaker.before()
+            with pytest.raises(CircuitOpen):
+                breaker.before()
+        with patch('src.circuit_breaker.time.monotonic', return_value=start + 62):
+            breaker.before()
+
+    def test_client_errors_do_not_trip_breaker(self):
+        from src import http_client
+        from src.circuit_breaker import get_breaker
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=404)
+        with patch('src.http_client.get_session', return_value=session):
+            for _ in range(10):
+                http_client.get('https://example.com/missing')
+        assert get_breaker('example.com').report()['state'] == 'closed'
+
+    def test_upstream_health_reported(self, client):
+        from src.circuit_breaker import get_breaker
+        get_breaker('query1.finance.yahoo.com').record_failure()
+        with patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.get_provider') as mock_provider:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            mock_provider.return_value.fetch.return_value = []
+            check_prices()
+        status = json.loads(client.get('/status').data)
+        health = json.loads(client.get('/health').data)
+        assert status['upstream']['query1.finance.yahoo.com']['score'] == 0.8
+        assert health['upstream'] == status['upstream']
+
+
+class TestMetrics:
+    def test_counter_and_histogram_exposition(self):
+        from src.metrics import Counter, Histogram, render
+        Counter("test_events_total", "Test events").inc(2, kind="a")
+        histogram = Histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        text = render()
+        assert '# TYPE test_events_total counter' in text
+        assert 'test_events_total{kind="a"} 2' in text
+        assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count 3' in text
+
+    def test_values_summed_across_workers(self, tmp_path):
+        from src.metrics import Counter, Histogram, render
+        Counter("test_jobs_total", "Test jobs").inc(kind="x")
+        Histogram("test_wait_seconds", "Test wait", buckets=(1,)).observe(0.5)
+        os.makedirs(tmp_path / "metrics", exist_ok=True)
+        with open(tmp_path / "metrics" / "99999-1.json", "w") as f:
+            json.dump([["test_jobs_total", {"kind": "x"}, 4], ["test_wait_seconds", {}, [1, 2, 3.5]]], f)
+        text = render()
+        assert 'test_jobs_total{kind="x"} 5' in text
+        assert 'test_wait_seconds_bucket{le="1"} 2' in text
+        assert 'test_wait_seconds_count 3' in text
+        assert 'test_wait_seconds_sum 4.0' in text
+
+    def test_label_values_escaped(self):
+        from src.metrics import format_labels
+        assert format_labels([("path", 'a"b\\c')]) == '{path="a\\"b\\\\c"}'
+
+    def test_metrics_endpoint_records_routes(self, client):
+        client.get('/health')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.data.decode()
+        assert 'price_drop_http_requests_total{method="GET",route="/health",status="200"} 1' in text
+
+    def test_check_cycle_instrumented(self):
+        from src.metrics import render
+        with patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.get_provider') as mock_provider:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            mock_provider.return_value.fetch.return_value = [
+                ('ISAC.L', None, ValueError('boom')),
+            ]
+            check_prices(['ISAC.L'])
+            mock_dt.now.return_value = datetime(2026, 2, 7, 12, 0, 0)
+            check_prices()
+        text = render()
+        assert 'price_drop_checks_total{result="ok"} 1' in text
+        assert 'price_drop_checks_total{result="skipped"} 1' in text
+        assert 'price_drop_quote_errors_total{symbol="ISAC.L"} 1' in text
+        assert 'price_drop_check_duration_seconds_count 1' in text
+
+    def test_scheduler_lag_recorded(self):
+        from datetime import timezone
+        from src import scheduler
+        from src.metrics import render
+        event = MagicMock(job_id='price_check_GPW',
+                          scheduled_run_times=[datetime.now(timezone.utc) - timedelta(seconds=2)])
+        scheduler.record_lag(event)
+        text = render()
+        assert 'price_drop_scheduler_lag_seconds_bucket{job="price_check_GPW",le="1"} 0' in text
+        assert 'price_drop_scheduler_lag_seconds_bucket{job="price_check_GPW",le="2.5"} 1' in text
+
+
+class TestIntradayAnalytics:
+    def candles(self, closes, volumes=None, start=1000):
+        return {
+            "timestamp": [start + 60 * i for i in range(len(closes))],
+            "high": [None if c is None else c + 1 for c in closes],
+            "low": [None if c is None else c - 1 for c in closes],
+            "close": closes,
+            "volume": volumes or [100] * len(closes),
+        }
+
+    def test_drop_from_high_and_vwap(self):
+        from src.analytics import intraday_analytics
+        result = intraday_analytics(self.candles([100, 110, 105]), 99.0)
+        assert result["drop_from_high"] == pytest.approx((99 - 111) / 111 * 100, abs=1e-4)
+        assert result["vwap_deviation"] == pytest.approx((99 - 105) / 105 * 100, abs=1e-4)
+
+    def test_drawdown_limited_to_window(self):
+        from src.analytics import intraday_analytics
+        closes = [100, 50] + [80] * 40 + [90, 81]
+        with patch('src.analytics.ANALYTICS_DRAWDOWN_MINUTES', 10):
+            result = intraday_analytics(self.candles(closes), 81.0)
+        assert result["drawdown"] == pytest.approx(-10.0)
+
+    def test_velocity_per_minute(self):
+        from src.analytics import intraday_analytics
+        closes = [100] * 10 + [100, 99, 98, 97, 96, 95]
+        with patch('src.analytics.ANALYTICS_VELOCITY_MINUTES', 5):
+            result = intraday_analytics(self.candles(closes), 95.0)
+        assert result["velocity"] == pytest.approx(-1.0)
+
+    def test_missing_minutes_skipped(self):
+        from src.analytics import intraday_analytics
+        assert intraday_analytics(self.candles([None, None]), 10.0) is None
+        result = intraday_analytics(self.candles([100, None, 100], volumes=[0, None, 0]), 100.0)
+        assert result["vwap_deviation"] is None
+
+    def test_full_profile_returns_candles(self):
+        from src.quotes import ChartQuoteProvider
+        reply = MagicMock()
+        reply.json.return_value = json.loads(TestReadMeta.BODY)
+        with patch('src.quotes.http_client.get', return_value=reply):
+            meta = ChartQuoteProvider(profile='full').fetch_one('ISAC.L')
+        assert set(meta['candles']) == {'timestamp', 'high', 'low', 'close', 'volume'}
+
+    def test_intraday_rules_alert(self):
+        from src.rules import compile_rules
+        from src.alert_engine import evaluate_alerts
+        rules = compile_rules({"*": [{"type": "vwap_deviation", "first": -1.0, "step": -0.5}]}, ['ISAC.L'])
+        quote = {'symbol': 'ISAC.L', 'price': 98.0, 'change_pct': -0.2,
+                 'intraday': {'vwap_deviation': -1.6, 'drawdown': -2.0, 'velocity': -0.1}}
+        alerts = evaluate_alerts([quote], rules, {})
+        assert [(a['rule'], a['level']) for a in alerts] == [('vwap_deviation', -1.5)]
+        assert alerts[0]['key'] == 'ISAC.L:vwap_deviation'
+
+    def test_check_cycle_adds_intraday_to_status(self):
+        meta = {'regularMarketPrice': 99.0, 'previousClose': 100.0, 'regularMarketTime': 1,
+                'candles': self.candles([100, 110, 105])}
+        with patch('src.price_checker.datetime') as mock_dt, \
+             patch('src.price_checker.get_provider') as mock_provider:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            mock_provider.return_value.fetch.return_value = [('ISAC.L', meta, None)]
+            check_prices(['ISAC.L'])
+        result = price_checker_module.get_last_check_status()['results'][0]
+        assert set(result['intraday']) == {'drop_from_high', 'vwap_deviation', 'drawdown', 'velocity'}
+        assert 'candles' not in result
+
+
+class TestLazyBoot:
+    def test_import_does_not_start_scheduler(self):
+        from src.scheduler import scheduler
+        assert not scheduler.running
+
+    def test_ready_reports_starting_until_warm(self, client):
+        with patch('src.boot.ready') as mock_ready, \
+             patch.dict('src.boot.state', {"warmup_seconds": None, "error": None}):
+            mock_ready.is_set.return_value = False
+            response = client.get('/ready')
+        assert response.status_code == 503
+        assert json.loads(response.data)['status'] == 'starting'
+        assert client.get('/health').status_code == 200
+
+    def test_warm_up_starts_scheduler_in_background(self):
+        import threading
+        from src import boot
+        with patch('src.scheduler.start_scheduler') as mock_start, \
+             patch('src.check_jobs.ensure_runner') as mock_runner, \
+             patch('src.boot.ready', threading.Event()), \
+             patch('src.boot.warmup_thread', None), \
+             patch.dict('src.boot.state', {"warmup_seconds": None, "error": None}):
+            create_app()
+            boot.warmup_thread.join(5)
+            assert boot.readiness()['ready'] is True
+            assert boot.readiness()['warmup_seconds'] is not None
+        mock_start.assert_called_once()
+        mock_runner.assert_called_once()
+
+    def test_failed_warm_up_stays_unready(self, client):
+        import threading
+        from src import boot
+        with patch('src.scheduler.start_scheduler', side_effect=RuntimeError('no scheduler')), \
+             patch('src.boot.ready', threading.Event()), \
+             patch.dict('src.boot.state', {"warmup_seconds": None, "error": None}):
+            boot.warm_up()
+            response = client.get('/ready')
+        assert response.status_code == 503
+        assert json.loads(response.data)['error'] == 'no scheduler'
+
+
+class TestFailedCycle:
+    def test_alerts_retried_after_failed_cycle(self, tmp_path):
+        quotes = [('ISAC.L', {'regularMarketPrice': 98.7, 'previousClose': 100.0, 'regularMarketTime': 1}, None)]
+        with patch('src.price_checker.get_provider') as mock_provider, \
+             patch('src.price_checker.queue_chat_alerts', side_effect=[RuntimeError('database is locked'), None]) as mock_queue, \
+             patch('src.alerts.ALERT_THRESHOLDS_FILE', str(tmp_path / 'alert_thresholds')), \
+             patch.dict('src.alerts.states', clear=True), \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            mock_provider.return_value.fetch.return_value = quotes
+            check_prices(['ISAC.L'])
+            assert price_checker_module.get_last_check_status()['success'] is False
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 30)
+            check_prices(['ISAC.L'])
+        assert mock_queue.call_count == 2
+        assert len(mock_queue.call_args.args[0][price_checker_module.TELEGRAM_CHAT_ID]) == 1
+        assert price_checker_module.get_last_check_status()['success'] is True
+
+
+class TestSubscriptions:
+    @pytest.fixture
+    def write_subscriptions(self, tmp_path):
+        def write(entries):
+            with open(tmp_path / "subscriptions.json", "w") as f:
+                json.dump(entries, f)
+        return write
+
+    def quote(self, symbol, change_pct):
+        return {'symbol': symbol, 'name': symbol, 'price': 100 + change_pct, 'change_pct': change_pct}
+
+    def test_registry_indexed_by_symbol(self):
+        from src.subscriptions import Registry
+        registry = Registry([
+            {"chat_id": 1, "symbols": ["ISAC.L"]},
+            {"chat_id": 2, "symbols": ["ISAC.L", "CNDX.L"]},
+            {"chat_id": 3, "symbols": ["*"], "rules": [{"type": "drop", "first": -2.0, "step": -1.0}]},
+        ], SYMBOLS)
+        assert registry.subscribers == 3
+        assert len(registry.groups) == 2
+        isac = {tuple(chats) for _, chats in registry.index['ISAC.L']}
+        assert isac == {('1', '2'), ('3',)}
+        assert [chats for _, chats in registry.index['VVSM.DE']] == [['3']]
+
+    def test_crossing_evaluated_once_per_group(self):
+        from src.subscriptions import Registry
+        entries = [{"chat_id": i, "symbols": ["ISAC.L"]} for i in range(1000)]
+        registry = Registry(entries, SYMBOLS)
+        with patch('src.subscriptions.evaluate_alerts', wraps=__import__('src.alert_engine', fromlist=['x']).evaluate_alerts) as spy:
+            fanned = registry.evaluate([self.quote('ISAC.L', -1.2)], {})
+        assert spy.call_count == 1
+        assert len(fanned) == 1
+        alert, chats = fanned[0]
+        assert len(chats) == 1000
+        assert alert['level'] == -1.0
+        assert alert['key'].startswith('sub:') and alert['key'].endswith(':ISAC.L')
+
+    def test_groups_keep_separate_state(self):
+        from src.subscriptions import Registry
+        registry = Registry([
+            {"chat_id": 1, "symbols": ["ISAC.L"]},
+            {"chat_id": 2, "symbols": ["ISAC.L"], "rules": [{"type": "drop", "first": -0.5, "step": -0.5}]},
+        ], SYMBOLS)
+        first = registry.evaluate([self.quote('ISAC.L', -1.2)], {})
+        state = {alert['key']: alert['level'] for alert, _ in first}
+        assert sorted(state.values()) == [-1.0, -1.0]
+        assert registry.evaluate([self.quote('ISAC.L', -1.2)], state) == []
+        again = registry.evaluate([self.quote('ISAC.L', -1.6)], state)
+        assert sorted((alert['level'], chats[0]) for alert, chats in again) == [(-1.5, '1'), (-1.5, '2')]
+
+    def test_check_cycle_batches_messages_per_chat(self, write_subscriptions):
+        write_subscriptions([
+            {"chat_id": "alice", "symbols": ["ISAC.L", "CNDX.L"]},
+            {"chat_id": "bob", "symbols": ["CNDX.L"], "rules": [{"type": "drop", "first": -3.0, "step": -1.0}]},
+        ])
+        prices = {'ISAC.L': 98.7, 'CNDX.L': 98.2}
+        with patch('src.price_checker.get_provider') as mock_provider, \
+             patch('src.price_checker.queue_chat_alerts') as mock_queue, \
+             patch('src.price_checker.get_alert_thresholds', return_value={}), \
+             patch('src.price_checker.record_alert_threshold') as mock_record, \
+             patch('src.price_checker.flush_alert_thresholds'), \
+             patch('src.price_checker.datetime') as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 2, 9, 12, 0, 0)
+            mock_provider.return_value.fetch.return_value = [
+                (symbol, {'regularMarketPrice': price, 'previousClose': 100.0}, None)
+                for symbol, price in prices.items()
+            ]
+            check_prices(list(prices))
+        mock_queue.assert_called_once()
+        by_chat = mock_queue.call_args.args[0]
+        assert len(by_chat[price_checker_module.TELEGRAM_CHAT_ID]) == 2
+        assert len(by_chat['alice']) == 2
+        assert 'bob' not in by_chat
+        keys = [c.args[0] for c in mock_record.call_args_list]
+        assert sum(k.startswith('sub:') for k in keys) == 2
+
+    def test_invalid_entries_skipped(self, write_subscriptions):
+        from src.subscriptions import get_subscriptions
+        write_subscriptions([
+            {"symbols": ["ISAC.L"]},
+            "oops",
+            {"chat_id": 2, "symbols": "ISAC.L"},
+            {"chat_id": 3, "rules": [{"type": "bogus"}]},
+            {"chat_id": 4, "rules": [{"type": "volatility", "window": "12"}]},
+            {"chat_id": 5, "symbols": ["ISAC.L"]},
+        ])
+        with patch('src.subscriptions.log_to_file') as mock_log:
+            registry = get_subscriptions()
+        assert registry.subscribers == 1
+        assert [chats for _, chats in registry.index['ISAC.L']] == [['5']]
+        assert mock_log.call_count == 5
+
+    def test_unreadable_file_ignored(self, tmp_path):
+        from src.subscriptions import get_subscriptions
+        with open(tmp_path / "subscriptions.json", "w") as f:
+            f.write('[{"chat_id": 1,')
+        with patch('src.subscriptions.log_to_file'):
+            assert get_subscriptions().subscribers == 0
+
+    def test_each_window_scored_on_its_own_prices(self):
+        from src import rules
+        from src.alert_engine import add_zscores, evaluate_alerts
+        from src.subscriptions import Registry
+        global_rules = rules.compile_rules({'*': [{'type': 'volatility', 'window': 3, 'band': 2.0}]}, ['X'])
+        registry = Registry([
+            {"chat_id": 1, "symbols": ["X"], "rules": [{"type": "volatility", "window": 20, "band": 2.0}]},
+        ], ['X'])
+        windows = {'X': sorted(set(global_rules['X'].windows) | set(registry.windows()['X']))}
+        assert windows == {'X': [3, 20]}
+        with patch.dict('src.rules.price_windows', clear=True):
+            for price in (100.0, 100.2, 99.8):
+                add_zscores([{'symbol': 'X', 'price': price, 'change_pct': 0.0}], windows)
+            quote, = add_zscores([{'symbol': 'X', 'price': 95.0, 'change_pct': -5.0}], windows)
+            assert quote['zscores'][20] is None
+            assert quote['zscores'][3] < -2.0
+            assert [a['rule'] for a in evaluate_alerts([quote], global_rules, {})] == ['volatility_down']
+            assert registry.evaluate([quote], {}) == []
+            for price in [90.0] * 16:
+                add_zscores([{'symbol': 'X', 'price': price, 'change_pct': 0.0}], windows)
+            quote, = add_zscores([{'symbol': 'X', 'price': 100.0, 'change_pct': 0.0}], windows)
+            assert len(rules.price_windows['X']) == 20
+        assert quote['zscores'][3] is None
+        assert quote['zscores'][20] > 2.0
+
+    def test_queue_chat_alerts_one_digest_per_chat(self):
+        from src import notifier
+        from src.db import get_connection
+        notifier.queue_chat_alerts({"1": ["a", "b"], "2": ["c"]})
+        rows = get_connection(notifier.NOTIFY_DB, notifier.SCHEMA).execute(
+            "SELECT chat_id, text FROM outbox ORDER BY id").fetchall()
+        assert [r[0] for r in rows] == ["1", "2"]
+        assert rows[0][1].startswith("🚨 2 alerts")